@@ -0,0 +1,307 @@
+import hashlib
+import hmac
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, make_response, render_template, request, session
+
+
+# ----------------------------
+# Admission control
+# ----------------------------
+# When voting opens every student arrives within minutes. Instead of
+# letting requests pile up until everything times out, each worker admits
+# what it can serve quickly and tells everyone else when to come back:
+#
+#   * a per-user token bucket stops one client from hammering a route
+#     (429, not queued);
+#   * a global token bucket caps how many requests per second start;
+#   * heavy requests (password checks, vote writes) also need one of
+#     max_concurrency slots, waiting at most max_wait seconds for one;
+#   * whoever is turned away gets a ticket for a slot in the waiting room
+#     ("you're number N, retry at T", 503 + Retry-After). Slots are handed
+#     out in arrival order at the admission rate, and a ticket holder who
+#     comes back on time is admitted ahead of new arrivals. While anyone
+#     is waiting, new arrivals queue behind them.
+#
+# Tickets are HMAC-signed slot times in a cookie, so they are honoured by
+# every worker. The buckets, slots and queue positions are per worker.
+#
+# On a route with heavy methods, only a heavy request uses up the ticket.
+# A queued login POST comes back from the waiting room as GET /login (the
+# form body is gone); that GET is let in and keeps the ticket, so the
+# re-typed POST still goes ahead of the line.
+
+TICKET_COOKIE = "vwise_queue"
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """0 if a token was taken, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class KeyedBuckets:
+    """One TokenBucket per key, least recently used keys dropped first."""
+
+    def __init__(self, rate, burst, max_keys=50000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.take()
+
+
+class WaitingRoom:
+    def __init__(self, rate, secret, max_queue_seconds=600.0, grace=30.0):
+        self.rate = rate
+        self.max_queue_seconds = max_queue_seconds
+        # How long after its slot a ticket is still honoured
+        self.grace = grace
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        # Tickets already used here, until they expire
+        self._used = {}
+
+    def _sign(self, slot):
+        text = f"{slot:.3f}"
+        mac = hmac.new(self._secret, text.encode("ascii"), hashlib.sha256).hexdigest()[:24]
+        return f"{text}.{mac}"
+
+    def _slot(self, ticket):
+        """The ticket's slot time, or None if it is forged or malformed."""
+        text = (ticket or "").rpartition(".")[0]
+        try:
+            slot = float(text)
+        except ValueError:
+            return None
+        if not hmac.compare_digest(self._sign(slot), ticket):
+            return None
+        return slot
+
+    def backlog(self, now):
+        """Seconds until the last ticket handed out comes due."""
+        return max(0.0, self._next_slot - now)
+
+    def issue(self, now, front=False):
+        """(ticket, slot) at the back of the line, or at the front for a
+        ticket holder who could not get a slot; None when the line is full."""
+        with self._lock:
+            if front:
+                slot = now + 1.0 / self.rate
+            else:
+                slot = max(now, self._next_slot) + 1.0 / self.rate
+                if slot - now > self.max_queue_seconds:
+                    return None
+                self._next_slot = slot
+        return self._sign(slot), slot
+
+    def check(self, ticket, now, consume=True):
+        """Returns "ready", ("early", slot) or None (invalid, expired or used).
+
+        consume=False checks a ready ticket without using it up.
+        """
+        slot = self._slot(ticket)
+        if slot is None or now > slot + self.grace:
+            return None
+        if now < slot:
+            return "early", slot
+        with self._lock:
+            if ticket in self._used:
+                return None
+            if not consume:
+                return "ready"
+            self._used[ticket] = slot + self.grace
+            if len(self._used) > 1000:
+                self._used = {t: exp for t, exp in self._used.items() if exp >= now}
+        return "ready"
+
+    def position(self, slot, now):
+        return max(1, math.ceil(round((slot - now) * self.rate, 6)))
+
+
+class Admission:
+    def __init__(self, secret, rate=50.0, burst=100, user_rate=1.0, user_burst=10,
+                 max_concurrency=4, max_wait=2.0, max_queue_seconds=600.0):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.user_buckets = KeyedBuckets(user_rate, user_burst)
+        self.room = WaitingRoom(rate, secret, max_queue_seconds=max_queue_seconds)
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {"admitted": 0, "queued": 0, "throttled": 0, "full": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def guard(self, heavy_methods=(), user_key=None, html_template=None):
+        """Decorator: admit the request or answer 429/503.
+
+        heavy_methods need a concurrency slot and are the only ones that use
+        up a waiting room ticket. user_key() returns the key for the
+        per-user limit (default: the logged-in user, if any). Browsers over
+        that limit get html_template with an error, if given.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = user_key() if user_key is not None else _session_user()
+                if key is not None:
+                    retry_after = self.user_buckets.take(key)
+                    if retry_after:
+                        self._count("throttled")
+                        return _throttled(retry_after, html_template)
+
+                heavy = request.method in heavy_methods
+                consume = heavy or not heavy_methods
+                denied = self._admit(heavy, consume)
+                if denied is not None:
+                    return denied
+
+                self._count("admitted")
+                try:
+                    response = make_response(view(*args, **kwargs))
+                finally:
+                    if heavy:
+                        self._release()
+                if consume and request.cookies.get(TICKET_COOKIE):
+                    response.delete_cookie(TICKET_COOKIE)
+                return response
+            return wrapper
+        return decorator
+
+    def _admit(self, heavy, consume=True):
+        """None when admitted (holding a slot if heavy), else the response."""
+        now = time.time()
+        ticket = request.cookies.get(TICKET_COOKIE)
+        state = self.room.check(ticket, now, consume) if ticket else None
+
+        if state == "ready":
+            # Their turn: skip the global bucket and the line
+            if not heavy or self._acquire():
+                return None
+            return self._queued(*self.room.issue(now, front=True), now)
+        if state is not None:
+            return self._queued(ticket, state[1], now)
+
+        # New arrival: no jumping the line while anyone is waiting
+        if not self.room.backlog(now) and not self.global_bucket.take():
+            if not heavy or self._acquire():
+                return None
+
+        issued = self.room.issue(now)
+        if issued is None:
+            self._count("full")
+            return _busy(self.room.max_queue_seconds)
+        return self._queued(*issued, now)
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.max_wait):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _queued(self, ticket, slot, now):
+        self._count("queued")
+        retry_after = max(1, math.ceil(slot - now))
+        position = self.room.position(slot, now)
+        body = {
+            "error": f"The server is busy. You are number {position} in line.",
+            "queued": True,
+            "position": position,
+            "retry_at": round(slot, 3),
+            "retry_after": retry_after,
+        }
+        if _wants_html():
+            response = make_response(render_template(
+                "waitingroom.html", position=position, retry_after=retry_after,
+                next_url=request.full_path if request.method == "GET" else request.path,
+            ), 503)
+        else:
+            response = make_response(jsonify(body), 503)
+        response.headers["Retry-After"] = str(retry_after)
+        response.set_cookie(TICKET_COOKIE, ticket, max_age=int(retry_after + self.room.grace),
+                            httponly=True, samesite="Lax")
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats["in_flight"] = self._in_flight
+        stats["max_concurrency"] = self.max_concurrency
+        stats["queue_seconds"] = round(self.room.backlog(time.time()), 3)
+        return stats
+
+
+def _session_user():
+    user_id = session.get("user_id")
+    return f"user:{user_id}" if user_id is not None else None
+
+
+def _wants_html():
+    # Page loads ask for text/html; fetch() sends */*
+    return request.accept_mimetypes.best_match(["application/json", "text/html"]) == "text/html"
+
+
+def _throttled(retry_after, html_template=None):
+    retry_after = max(1, math.ceil(retry_after))
+    if html_template and _wants_html():
+        response = make_response(render_template(
+            html_template,
+            error=f"Too many attempts. Please wait {retry_after} seconds and try again.",
+        ), 429)
+    else:
+        response = make_response(jsonify({
+            "error": "Too many requests. Please slow down.",
+            "retry_after": retry_after,
+        }), 429)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _busy(retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    response = make_response(jsonify({
+        "error": "The waiting line is full. Please try again later.",
+        "retry_after": retry_after,
+    }), 503)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
@@ -1,10 +1,69 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, jsonify
-import mysql.connector
+from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, jsonify, Response
 import mimetypes
 from functools import wraps
 from flask import jsonify
 from flask_cors import CORS
+import threading
+import atexit
+import time
+import logging
+
+from config import (
+    DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_AFTER, DB_POOL_RECYCLE, BALLOT_CACHE_MAX_AGE,
+    VOTE_WRITE_BEHIND, VOTE_LOG_DIR, VOTE_FSYNC_WINDOW, VOTE_FLUSH_BATCH, VOTE_FLUSH_INTERVAL,
+    IMAGE_STORE_DIR, METRICS_TOKEN, LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE, LOG_QUEUE_SIZE,
+    SESSION_BACKEND, SESSION_DB_PATH, SESSION_TTL, SESSION_CACHE_SIZE, SESSION_CACHE_SECONDS,
+    SECRET_KEY_PATH, RESULTS_STREAM_MAX_SUBSCRIBERS, RESULTS_STREAM_POLL_INTERVAL,
+    RESULTS_STREAM_MIN_INTERVAL, RESULTS_STREAM_MAX_SECONDS, ASSET_BUILD_DIR,
+    COMPRESS_MIN_SIZE, JSON_STREAM_MIN_ITEMS, ADMISSION_RATE, ADMISSION_BURST,
+    ADMISSION_USER_RATE, ADMISSION_USER_BURST, ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_WAIT,
+    ADMISSION_MAX_QUEUE_SECONDS, DB_BACKEND, SQLITE_DB_PATH, SQLITE_SYNCHRONOUS,
+    DB_REPLICAS, DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL, DB_READ_YOUR_WRITES_SECONDS,
+    ELECTION_REFRESH_INTERVAL, RECEIPT_LOG_INTERVAL, RECEIPT_LOG_BATCH,
+)
+from db_pool import ConnectionPool, PoolTimeout
+from storage import make_storage
+from replicas import ReplicaRouter, parse_replicas
+from metrics import Metrics, InstrumentedConnection
+from logs import configure_logging, dropped_records
+from sessions import (
+    SessionStore, SqliteSessionBackend, MemorySessionBackend, ServerSessionInterface,
+    load_secret_key, session_key,
+)
+from ballots import (
+    parse_ballot, validate_choices, check_not_voted, write_ballot, claim_ballot,
+    InvalidBallot, DuplicateVote,
+)
+from vote_queue import VoteQueue
+from migrations import current_version, LATEST_VERSION
+from tally import get_results, get_turnout
+from ballot_cache import BallotCache
+from results_stream import ResultsBroadcaster
+from moderation import InvalidBatch, parse_batch, moderate
+from listings import (
+    CANDIDATE_LISTING, PARTYLIST_LISTING, InvalidQuery, list_page, count_rows, listing_counts,
+)
+from credentials import (
+    hash_password, verify_password, needs_rehash, burn_verify,
+)
+from bulk_import import (
+    iter_request_rows, run_import, normalize_account, insert_accounts,
+    normalize_partylist, insert_partylists,
+)
+from assets import Assets
+from responses import FastJSONProvider, Compression, json_array
+from admission import Admission
+from election import ElectionState, ElectionUnavailable, InvalidSettings
+from receipt_log import (
+    ReceiptSequencer, ReceiptNotFound, InvalidTreeSize, get_root, inclusion_proof,
+)
+from image_store import (
+    ImageStore, InvalidImage, image_url, is_data_url, migrate_inline_photos,
+)
+
+configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE, LOG_QUEUE_SIZE)
+log = logging.getLogger("vwise")
 
 # Force browser to recognize CSS correctly
 mimetypes.add_type('text/css', '.css')
@@ -21,19 +80,225 @@ app = Flask(
     static_folder=frontend_path,
     static_url_path='/static'
 )
-app.secret_key = 'supersecretkey'
+app.secret_key = load_secret_key(SECRET_KEY_PATH)
 CORS(app)
+
+# Server-side sessions: the cookie holds a random token, the session lives
+# in a store shared by all workers (see sessions.py).
+session_store = SessionStore(
+    SqliteSessionBackend(SESSION_DB_PATH) if SESSION_BACKEND == 'sqlite' else MemorySessionBackend(),
+    ttl=SESSION_TTL,
+    cache_size=SESSION_CACHE_SIZE,
+    cache_seconds=SESSION_CACHE_SECONDS,
+)
+app.session_interface = ServerSessionInterface(session_store)
+
+# Faster JSON encoding and gzip/brotli for API responses (see responses.py)
+app.json = FastJSONProvider(app)
+Compression(min_size=COMPRESS_MIN_SIZE).init_app(app)
+
+# Per-route latency and DB time, served on /metrics
+metrics = Metrics()
+metrics.init_app(app)
+
 # ----------------------------
 # Database connection
 # ----------------------------
+# MySQL, or one SQLite file on a polling station (see storage.py)
+storage = make_storage(DB_BACKEND, DB_CONFIG, SQLITE_DB_PATH, SQLITE_SYNCHRONOUS)
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    # Created lazily so each worker process builds its own pool after fork.
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    storage.connect,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    ping_after=DB_POOL_PING_AFTER,
+                    recycle=DB_POOL_RECYCLE,
+                )
+    return _db_pool
+
 def get_db_connection():
-    conn = mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='',
-        database='vwise_vote'
+    # conn.close() hands the connection back to the pool. Cursors are
+    # timed for the request's DB metrics.
+    started = time.perf_counter()
+    conn = get_db_pool().get()
+    metrics.record_pool_wait(time.perf_counter() - started)
+    return InstrumentedConnection(conn, metrics)
+
+# Read replicas for the read-only routes (see replicas.py). Replica pools
+# give up quickly so a busy replica falls back to the primary.
+def make_replica_pool(host, port):
+    return ConnectionPool(
+        lambda: storage.connect(host=host, port=port),
+        size=DB_POOL_SIZE,
+        timeout=min(DB_POOL_TIMEOUT, 0.5),
+        ping_after=DB_POOL_PING_AFTER,
+        recycle=DB_POOL_RECYCLE,
     )
-    return conn
+
+replica_hosts = parse_replicas(DB_REPLICAS) if storage.dialect == 'mysql' else []
+read_router = ReplicaRouter(
+    get_db_connection,
+    [(f"{host}:{port}", make_replica_pool(host, port)) for host, port in replica_hosts],
+    wrap=lambda conn: InstrumentedConnection(conn, metrics),
+    max_lag=DB_REPLICA_MAX_LAG,
+    check_interval=DB_REPLICA_CHECK_INTERVAL,
+    sticky_seconds=DB_READ_YOUR_WRITES_SECONDS,
+)
+read_router.init_app(app)
+
+def get_read_connection():
+    # Read-only queries only: may be a replica a moment behind the primary
+    return read_router.connect()
+
+ballot_cache = BallotCache(get_read_connection, max_age=BALLOT_CACHE_MAX_AGE)
+image_store = ImageStore(IMAGE_STORE_DIR)
+assets = Assets(ASSET_BUILD_DIR)
+results_stream = ResultsBroadcaster(
+    get_db_connection,
+    poll_interval=RESULTS_STREAM_POLL_INTERVAL,
+    min_interval=RESULTS_STREAM_MIN_INTERVAL,
+    max_subscribers=RESULTS_STREAM_MAX_SUBSCRIBERS,
+    max_stream_seconds=RESULTS_STREAM_MAX_SECONDS,
+)
+
+# Voting window, checked from memory on every vote (see election.py). The
+# version polls go to the primary: a lagging replica would hold back a close.
+election = ElectionState(get_db_connection, refresh_interval=ELECTION_REFRESH_INTERVAL)
+
+# Appends committed ballots to the Merkle receipt log (see receipt_log.py)
+receipt_sequencer = ReceiptSequencer(
+    get_db_connection, interval=RECEIPT_LOG_INTERVAL, batch_size=RECEIPT_LOG_BATCH,
+)
+
+# Rate limits, concurrency limit and waiting room for the routes every
+# student hits when voting opens (see admission.py)
+admission = Admission(
+    app.secret_key,
+    rate=ADMISSION_RATE,
+    burst=ADMISSION_BURST,
+    user_rate=ADMISSION_USER_RATE,
+    user_burst=ADMISSION_USER_BURST,
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_wait=ADMISSION_MAX_WAIT,
+    max_queue_seconds=ADMISSION_MAX_QUEUE_SECONDS,
+)
+
+def login_attempt_key():
+    # Repeated password guesses are limited per student number
+    if request.method == 'POST':
+        return f"login:{request.form.get('studentNumber', '')}"
+    return None
+
+# ----------------------------
+# Background services
+# ----------------------------
+vote_queue = None
+_services_lock = threading.Lock()
+_photo_migration_started = False
+
+def start_vote_queue():
+    # Started on the first request rather than at import time, so the
+    # reloader's parent process and a pre-fork master never own a journal.
+    global vote_queue
+    if not VOTE_WRITE_BEHIND or vote_queue is not None:
+        return
+    with _services_lock:
+        if vote_queue is None:
+            queue = VoteQueue(
+                VOTE_LOG_DIR,
+                get_db_connection,
+                batch_size=VOTE_FLUSH_BATCH,
+                flush_interval=VOTE_FLUSH_INTERVAL,
+                fsync_window=VOTE_FSYNC_WINDOW,
+            )
+            queue.start()
+            atexit.register(queue.stop)
+            vote_queue = queue
+
+def start_photo_migration():
+    # Moves base64 photos left in candidates.photo by older versions into
+    # the image store, once per process, off the request path.
+    global _photo_migration_started
+    if _photo_migration_started:
+        return
+    with _services_lock:
+        if _photo_migration_started:
+            return
+        _photo_migration_started = True
+
+    def run():
+        conn = get_db_connection()
+        try:
+            moved = migrate_inline_photos(conn, image_store)
+            if moved:
+                log.info("moved candidate photos into the image store", extra={"moved": moved})
+        except Exception:
+            log.exception("photo migration failed")
+        finally:
+            conn.close()
+
+    threading.Thread(target=run, name="photo-migration", daemon=True).start()
+
+@app.before_request
+def start_background_services():
+    start_vote_queue()
+    start_photo_migration()
+    receipt_sequencer.start()
+
+def stop_background_services():
+    # Called by the production server when a worker exits (see serve.py)
+    if vote_queue is not None:
+        vote_queue.stop()
+    if _db_pool is not None:
+        _db_pool.close_all()
+    read_router.stop()
+    election.stop()
+    receipt_sequencer.stop()
+    for replica in read_router.replicas:
+        replica.pool.close_all()
+
+def candidates_changed():
+    # Call after any change to the candidates table. The caches refill
+    # from the primary until the replicas have caught up.
+    read_router.pin_primary()
+    ballot_cache.invalidate()
+    listing_counts.clear()
+
+def partylists_changed():
+    read_router.pin_primary()
+    listing_counts.clear()
+
+@app.errorhandler(InvalidQuery)
+def handle_invalid_query(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(InvalidBatch)
+def handle_invalid_batch(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(InvalidSettings)
+def handle_invalid_settings(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(ReceiptNotFound)
+def handle_receipt_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+@app.errorhandler(InvalidTreeSize)
+def handle_invalid_tree_size(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    return jsonify({"error": "Server is busy, please try again."}), 503
 
 # ----------------------------
 # Helper: login required decorator
@@ -53,6 +318,21 @@ def login_required(role=None):
         return wrapper
     return decorator
 
+def voting_open_required(func):
+    # Checked before admission so a closed election costs no slot or query
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            snapshot = election.snapshot()
+        except ElectionUnavailable:
+            return jsonify({"error": "Election status is unavailable, please try again."}), 503
+        status = snapshot.effective_status()
+        if status != 'active':
+            message = "Voting has closed." if status == 'closed' else "Voting has not started yet."
+            return jsonify({"error": message, "election_status": status}), 403
+        return func(*args, **kwargs)
+    return wrapper
+
 # ----------------------------
 # Routes
 # ----------------------------
@@ -62,27 +342,40 @@ def index():
     return redirect(url_for('login'))
 
 @app.route('/login', methods=['GET', 'POST'])
+@admission.guard(heavy_methods=('POST',), user_key=login_attempt_key, html_template='login.html')
 def login():
     if request.method == 'POST':
         student_no = request.form.get('studentNumber')
         pwd = request.form.get('password')
-        print("Login attempt:", student_no, pwd)
 
+        # Indexed lookup by studentNumber, only the columns login needs
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM accounts WHERE studentNumber = %s AND password = %s"
-        cursor.execute(query, (student_no, pwd))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        print("User fetched:", user)
+        try:
+            cursor.execute(
+                "SELECT id, department, password FROM accounts WHERE studentNumber = %s",
+                (student_no,)
+            )
+            account = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+
+        # Hash check runs without holding a pooled connection
+        user = None
+        if account is None:
+            burn_verify(pwd)
+        elif verify_password(pwd, account['password']):
+            user = account
+            if needs_rehash(account['password']):
+                rehash_password(account['id'], pwd)
 
         if user:
+            session.regenerate()
             session['user_id'] = user['id']
             # Strip spaces and uppercase
             session['role'] = user['department'].strip().upper()
-            print("Session role after login:", session['role'])
+            log.info("login", extra={"user_id": user['id'], "role": session['role'], "sample": True})
 
             if session['role'] == 'ADMIN':
                 return redirect(url_for('adminhome'))
@@ -90,11 +383,25 @@ def login():
                 return redirect(url_for('userhome'))
 
         else:
-            print("Login failed")
+            log.info("login failed", extra={"student_number": student_no, "sample": True})
             return render_template('login.html', error='Invalid Credentials')
 
     return render_template('login.html')
 
+def rehash_password(user_id, password):
+    # Upgrades plaintext or low-cost hashes after a successful login
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE accounts SET password = %s WHERE id = %s",
+                       (hash_password(password), user_id))
+        conn.commit()
+    except Exception:
+        log.exception("could not rehash password", extra={"user_id": user_id})
+    finally:
+        cursor.close()
+        conn.close()
+
 @app.route('/adminhome')
 @login_required(role='ADMIN')
 def adminhome():
@@ -102,6 +409,7 @@ def adminhome():
 
 @app.route('/userdashboard')
 @login_required()
+@admission.guard()
 def userhome():
     return render_template('userhome.html')
 
@@ -117,7 +425,7 @@ def add_account():
     studentNumber = data.get('studentNumber')
     yearlevel = data.get('yearlevel')
     department = data.get('department')
-    password = data.get('password')
+    password = hash_password(data.get('password') or '')
 
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -138,6 +446,24 @@ def add_account():
         cursor.close()
         conn.close()
 
+@app.route('/admin/bulk-register', methods=['POST'])
+@app.route('/api/admin/bulk-register', methods=['POST'])
+@login_required(role='ADMIN')
+def bulk_register():
+    # Streams {"users": [...]} or a CSV upload; see bulk_import.py
+    rows = iter_request_rows(request, 'users')
+
+    conn = get_db_connection()
+    try:
+        report = run_import(conn, rows, normalize_account, insert_accounts)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+    status = 400 if report.fatal else 200
+    return jsonify(report.as_dict()), status
+
 @app.route('/votenow')
 @login_required()
 def votenow():
@@ -194,6 +520,8 @@ def profile_html_redirect():
 
 @app.route('/submit-vote', methods=['POST'])
 @login_required()  # Ensure only logged-in users can vote
+@voting_open_required
+@admission.guard(heavy_methods=('POST',))
 def submit_vote():
     votes = request.json
     user_id = session.get('user_id')
@@ -201,40 +529,196 @@ def submit_vote():
     if not user_id:
         return jsonify({"error": "User not logged in"}), 401
 
+    try:
+        choices = parse_ballot(votes)
+    except InvalidBallot as e:
+        return jsonify({"error": str(e)}), 400
+
+    if vote_queue is not None:
+        return queue_vote(user_id, choices)
+
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        # Optional: check if user has already voted
-        cursor.execute("SELECT COUNT(*) AS count FROM votes WHERE user_id = %s", (user_id,))
-        already_voted = cursor.fetchone()[0]
-        if already_voted > 0:
-            return jsonify({"error": "You have already voted!"}), 400
-
-        # Insert each vote
-        for position, data in votes.items():
-            candidate_id = data['candidate_id']
-            cursor.execute("""
-                INSERT INTO votes (user_id, candidate_id, position, voted_at)
-                VALUES (%s, %s, %s, NOW())
-            """, (user_id, candidate_id, position))
-        
-        conn.commit()
-        return jsonify({"success": True, "message": "Vote submitted successfully!"})
+        # One transaction, one multi-row insert; voter_status blocks double votes
+        receipt = write_ballot(conn, user_id, choices)
+        log.info("vote submitted", extra={"user_id": user_id, "sample": True})
+        results_stream.notify()
+        receipt_sequencer.notify()
+        return jsonify({"success": True, "message": "Vote submitted successfully!", "receipt": receipt})
+    
+    except DuplicateVote as e:
+        return jsonify({"error": str(e)}), 400
+
+    except InvalidBallot as e:
+        return jsonify({"error": str(e)}), 400
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+    finally:
+        conn.close()
+
+def queue_vote(user_id, choices):
+    # Write-behind mode: validate now, journal the ballot, claim the voter's
+    # voter_status row, let the flusher load the votes. The claim is what
+    # stops a second ballot submitted on another worker at the same time.
+    if vote_queue.has_pending(user_id):
+        return jsonify({"error": "You have already voted!"}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        check_not_voted(cursor, user_id)
+        rows = validate_choices(cursor, choices)
+    except (DuplicateVote, InvalidBallot) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
     finally:
         cursor.close()
         conn.close()
 
+    try:
+        receipt = vote_queue.submit(user_id, rows)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    if receipt is None:
+        return jsonify({"error": "You have already voted!"}), 400
+
+    conn = get_db_connection()
+    try:
+        claim_ballot(conn, user_id, receipt)
+    except DuplicateVote as e:
+        # The journaled copy is rejected when it is flushed
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+    log.info("vote queued", extra={"user_id": user_id, "sample": True})
+    return jsonify({"success": True, "message": "Vote submitted successfully!", "receipt": receipt})
+
+# ----------------------------
+# Vote receipts (Merkle log, see receipt_log.py)
+# ----------------------------
+# Public: anyone holding a receipt can check that ballot against the
+# published root.
+
+@app.route('/receipts/root', methods=['GET'])
+@app.route('/api/receipts/root', methods=['GET'])
+def receipt_log_root():
+    conn = get_read_connection()
+    try:
+        return jsonify(get_root(conn))
+    finally:
+        conn.close()
+
+@app.route('/receipts/<receipt>/proof', methods=['GET'])
+@app.route('/api/receipts/<receipt>/proof', methods=['GET'])
+def receipt_proof(receipt):
+    tree_size = request.args.get('tree_size', type=int)
+    conn = get_read_connection()
+    try:
+        proof = inclusion_proof(conn, receipt.lower(), tree_size)
+    finally:
+        conn.close()
+    if proof['status'] == 'pending':
+        # Committed, not appended yet; normally a second or two
+        response = jsonify(proof)
+        response.status_code = 202
+        response.headers['Retry-After'] = str(max(1, int(RECEIPT_LOG_INTERVAL)))
+        return response
+    return jsonify(proof)
+
+@app.route('/admin/vote-queue', methods=['GET'])
+@login_required(role='ADMIN')
+def vote_queue_stats():
+    if vote_queue is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(vote_queue.stats(), enabled=True))
+
+@app.route('/admin/admission', methods=['GET'])
+@login_required(role='ADMIN')
+def admission_stats():
+    return jsonify(admission.stats())
+
+# ----------------------------
+# Election schedule
+# ----------------------------
+
+@app.route('/election/status', methods=['GET'])
+@app.route('/api/election/status', methods=['GET'])
+def election_status():
+    # Polled by every open page: answered from memory, and a matching
+    # If-None-Match gets an empty 304
+    try:
+        snapshot = election.snapshot()
+    except ElectionUnavailable:
+        return jsonify({"error": "Election status is unavailable, please try again."}), 503
+    response = jsonify(snapshot.as_dict())
+    response.set_etag(f"{snapshot.version}-{snapshot.effective_status()}")
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/admin/election/settings', methods=['PUT'])
+@app.route('/api/admin/election/settings', methods=['PUT'])
+@login_required(role='ADMIN')
+def update_election_settings():
+    snapshot = election.update(request.get_json(silent=True), user_id=session.get('user_id'))
+    log.info("election settings updated", extra={
+        "user_id": session.get('user_id'), "status": snapshot.status, "version": snapshot.version})
+    return jsonify(dict(snapshot.as_dict(), success=True))
+
+# ----------------------------
+# Results (served from the live tally counters, see tally.py)
+# ----------------------------
+# adminhome.html calls these through API_URL, which carries an /api prefix.
+
+@app.route('/admin/results/detailed', methods=['GET'])
+@app.route('/api/admin/results/detailed', methods=['GET'])
+@login_required(role='ADMIN')
+def results_detailed():
+    return jsonify(get_results(get_db_connection))
+
+@app.route('/admin/results/stream', methods=['GET'])
+@app.route('/api/admin/results/stream', methods=['GET'])
+@login_required(role='ADMIN')
+def results_stream_events():
+    # Server-Sent Events: a "snapshot" with all results and turnout, then
+    # "delta" events with only what changed (see results_stream.py).
+    stream = results_stream.subscribe()
+    if stream is None:
+        # This worker's stream slots are taken; the dashboard polls instead
+        return jsonify({"error": "Too many live dashboards, falling back to polling."}), 503
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/turnout', methods=['GET'])
+@app.route('/api/turnout', methods=['GET'])
+@login_required(role='ADMIN')
+def turnout():
+    return jsonify(get_turnout(get_db_connection))
+
+
+def add_photo_urls(row):
+    # candidates.photo holds an image store key; lists return URLs
+    key = row.get('photo')
+    row['photo'] = image_url(key, 'medium')
+    row['photo_thumb'] = image_url(key, 'thumb')
+    row['photo_full'] = image_url(key, 'full')
 
 @app.route('/get-candidates-simple', methods=['GET'])
 def get_candidates_simple():
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
+    # Legacy base64 photos are left out; the list only carries image URLs
     cursor.execute("""
         SELECT 
             id,
@@ -242,10 +726,10 @@ def get_candidates_simple():
             last_name,
             college,
             position,
-            photo
+            CASE WHEN photo LIKE 'data:%' THEN NULL ELSE photo END AS photo
         FROM candidates
         WHERE approved = 1
-        ORDER BY CAST(position AS UNSIGNED), last_name ASC
+        ORDER BY position, last_name ASC
     """)
 
     rows = cursor.fetchall()
@@ -253,112 +737,104 @@ def get_candidates_simple():
     cursor.close()
     conn.close()
 
-    return jsonify(rows)
+    return json_array(rows, transform=add_photo_urls, stream_min_items=JSON_STREAM_MIN_ITEMS)
 
 
 @app.route('/get-candidates', methods=['GET'])
+@voting_open_required
+@admission.guard()
 def get_candidates():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    # Pre-serialized, grouped ballot from memory (see ballot_cache.py)
+    body, etag = ballot_cache.get()
 
-    # Fetch all approved candidates
-    cursor.execute("""
-        SELECT id, first_name, last_name, student_id, college, year_level,
-               position, affiliation_type, platform
-        FROM candidates
-        WHERE approved = 1
-    """)
-
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    print("=== DEBUG: Raw candidates from database ===")
-    for row in rows:
-        print(f"ID: {row['id']}, Name: {row['first_name']} {row['last_name']}, Position: {row['position']} (type: {type(row['position'])})")
-    
-    # Position mapping
-    position_names = {
-        '1': 'President',
-        '2': 'Vice President',
-        '3': 'Secretary',
-        '4': 'Assistant Secretary',
-        '5': 'Treasurer',
-        '6': 'Auditor',
-        '7': 'PIO (Public Information Officer)',
-        '8': 'COE Representative',
-        '9': 'CBAA Representative',
-        '10': 'CTE Representative',
-        '11': 'CCS Representative',
-        '12': 'CCJE Representative',
-        '13': 'CIT Representative',
-        '14': 'CAS Representative',
-        '15': 'CHMT Representative'
-    }
-    
-    # Also handle integer keys
-    position_names_int = {
-        1: 'President',
-        2: 'Vice President',
-        3: 'Secretary',
-        4: 'Assistant Secretary',
-        5: 'Treasurer',
-        6: 'Auditor',
-        7: 'PIO (Public Information Officer)',
-        8: 'COE Representative',
-        9: 'CBAA Representative',
-        10: 'CTE Representative',
-        11: 'CCS Representative',
-        12: 'CCJE Representative',
-        13: 'CIT Representative',
-        14: 'CAS Representative',
-        15: 'CHMT Representative'
-    }
-    
-    # Format the data to include full_name, party, and position_name for display
-    for row in rows:
-        row['full_name'] = f"{row['first_name']} {row['last_name']}"
-        row['party'] = row['affiliation_type'].title() if row['affiliation_type'] else 'Independent'
-        
-        # Try to get position name from both string and int mappings
-        pos_key = row['position']
-        row['position_name'] = position_names.get(str(pos_key), position_names_int.get(pos_key, str(pos_key)))
-        
-        # Ensure position is treated as integer for sorting
-        try:
-            row['position_int'] = int(row['position'])
-        except (ValueError, TypeError):
-            row['position_int'] = 999  # Put invalid positions at the end
-        
-        print(f"Processed: {row['full_name']}, Position: {row['position']}, Position Int: {row['position_int']}, Position Name: {row['position_name']}")
-
-    # Sort by position number
-    rows.sort(key=lambda x: x['position_int'])
-    
-    print("=== DEBUG: After sorting ===")
-    for row in rows:
-        print(f"{row['position_int']}: {row['position_name']} - {row['full_name']}")
-    
-    # Group candidates by position NAME - maintain order with OrderedDict
-    from collections import OrderedDict
-    data = OrderedDict()
-    
-    for row in rows:
-        pos_name = row['position_name']
-        if pos_name not in data:
-            data[pos_name] = []
-        data[pos_name].append(row)
-
-    print("=== DEBUG: Final grouped data ===")
-    for pos_name in data.keys():
-        print(f"Position: {pos_name}, Count: {len(data[pos_name])}")
-
-    return jsonify(data)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers must revalidate; a matching If-None-Match gets an empty 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/ping')
 def ping():
     return 'pong'
 
+_ready_schema_version = None
+
+@app.route('/ready')
+def ready():
+    # Readiness probe for load balancers: unlike /ping this checks
+    # the database, the schema version and the vote queue.
+    global _ready_schema_version
+    checks = {}
+    try:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            # The schema only moves forward, so once current it stays current
+            if _ready_schema_version != LATEST_VERSION:
+                _ready_schema_version = current_version(conn)
+        finally:
+            conn.close()
+        checks['database'] = True
+        checks['schema'] = _ready_schema_version == LATEST_VERSION
+    except Exception:
+        checks['database'] = False
+        checks['schema'] = False
+
+    if VOTE_WRITE_BEHIND:
+        checks['vote_queue'] = vote_queue is not None and vote_queue.stats()['running']
+
+    ok = all(checks.values())
+    return jsonify({"ready": ok, "checks": checks, "pid": os.getpid()}), (200 if ok else 503)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrapers do not log in; set VWISE_METRICS_TOKEN to require
+    # "Authorization: Bearer <token>".
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return 'Unauthorized', 401
+
+    admitted = admission.stats()
+    gauges = [('vwise_log_records_dropped', 'Log records dropped because the queue was full',
+               dropped_records()),
+              ('vwise_admission_admitted', 'Requests admitted on the guarded routes', admitted['admitted']),
+              ('vwise_admission_queued', 'Requests sent to the waiting room', admitted['queued']),
+              ('vwise_admission_throttled', 'Requests over the per-user limit', admitted['throttled']),
+              ('vwise_admission_rejected_full', 'Requests turned away with the line full', admitted['full']),
+              ('vwise_admission_in_flight', 'Logins and votes running', admitted['in_flight']),
+              ('vwise_admission_queue_seconds', 'Wait for a new ticket', admitted['queue_seconds']),
+              ('vwise_election_voting_open', 'Whether this worker accepts votes', int(election.voting_open())),
+              ('vwise_receipt_log_appended', 'Ballots this worker appended to the receipt log',
+               receipt_sequencer.stats()['appended'])]
+    if read_router.enabled:
+        routed = read_router.stats()
+        gauges += [
+            ('vwise_db_reads_replica', 'Read connections served by a replica', routed['reads']['replica']),
+            ('vwise_db_reads_primary', 'Reads sent to the primary for read-your-writes', routed['reads']['primary']),
+            ('vwise_db_reads_fallback', 'Reads that fell back to the primary', routed['reads']['fallback']),
+            ('vwise_db_replicas_healthy', 'Replicas in rotation',
+             sum(1 for r in routed['replicas'] if r['healthy'])),
+        ]
+    if _db_pool is not None:
+        pool = _db_pool.stats()
+        gauges += [
+            ('vwise_db_pool_size', 'Maximum connections in this worker\'s pool', pool['size']),
+            ('vwise_db_pool_open', 'Open connections', pool['open']),
+            ('vwise_db_pool_in_use', 'Connections checked out', pool['in_use']),
+            ('vwise_db_pool_waits', 'Checkouts that had to wait', pool['waits']),
+            ('vwise_db_pool_wait_seconds', 'Total time spent waiting for a connection',
+             pool['wait_seconds_total']),
+            ('vwise_db_pool_timeouts', 'Checkouts that timed out', pool['timeouts']),
+        ]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/db-pool', methods=['GET'])
+@login_required(role='ADMIN')
+def db_pool_stats():
+    return jsonify(dict(get_db_pool().stats(), replicas=read_router.stats()))
+
 @app.route('/adminapproval')
 @login_required(role='ADMIN')
 def adminapproval():
@@ -371,28 +847,52 @@ def adminapproval_html_redirect():
 @app.route('/get-pending-candidates', methods=['GET'])
 @login_required(role='ADMIN')
 def get_pending_candidates():
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
     cursor.execute("""
         SELECT id, first_name, last_name, student_id, email, college, year_level,
-               position, affiliation_type, platform, photo, approved, created_at
+               position, affiliation_type, platform,
+               CASE WHEN photo LIKE 'data:%' THEN NULL ELSE photo END AS photo,
+               approved, created_at
         FROM candidates
         ORDER BY created_at DESC
     """)
 
     rows = cursor.fetchall()
     
-    # Format the data to include full_name for display
-    for row in rows:
-        row['full_name'] = f"{row['first_name']} {row['last_name']}"
-        # Use affiliation_type as "party" for display
-        row['party'] = row['affiliation_type'].title() if row['affiliation_type'] else 'Independent'
-    
     cursor.close()
     conn.close()
 
-    return jsonify(rows)
+    return json_array(rows, transform=format_pending_candidate, stream_min_items=JSON_STREAM_MIN_ITEMS)
+
+def format_pending_candidate(row):
+    add_photo_urls(row)
+    # full_name and affiliation_type as "party" for display
+    row['full_name'] = f"{row['first_name']} {row['last_name']}"
+    row['party'] = row['affiliation_type'].title() if row['affiliation_type'] else 'Independent'
+
+# Paginated listings for the approval pages (see listings.py):
+#   ?limit=50&cursor=<next_cursor>&approved=0|1&position=&college=&fields=id,full_name,...
+@app.route('/admin/candidates', methods=['GET'])
+@app.route('/api/admin/candidates', methods=['GET'])
+@login_required(role='ADMIN')
+def list_candidates():
+    conn = get_read_connection()
+    try:
+        page = list_page(conn, CANDIDATE_LISTING, request.args)
+    finally:
+        conn.close()
+    for row in page['items']:
+        if 'photo' in row:
+            add_photo_urls(row)
+    return jsonify(page)
+
+@app.route('/admin/candidates/count', methods=['GET'])
+@app.route('/api/admin/candidates/count', methods=['GET'])
+@login_required(role='ADMIN')
+def count_candidates():
+    return jsonify({"total": count_rows(get_read_connection, CANDIDATE_LISTING, request.args)})
 
 @app.route('/approve-candidate/<int:candidate_id>', methods=['POST'])
 @login_required(role='ADMIN')
@@ -408,6 +908,7 @@ def approve_candidate(candidate_id):
         """, (candidate_id,))
         
         conn.commit()
+        candidates_changed()
         return jsonify({"success": True, "message": "Candidate approved successfully!"})
     
     except Exception as e:
@@ -431,6 +932,7 @@ def reject_candidate(candidate_id):
         """, (candidate_id,))
         
         conn.commit()
+        candidates_changed()
         return jsonify({"success": True, "message": "Candidate approval revoked!"})
     
     except Exception as e:
@@ -449,6 +951,7 @@ def delete_candidate(candidate_id):
     try:
         cursor.execute("DELETE FROM candidates WHERE id = %s", (candidate_id,))
         conn.commit()
+        candidates_changed()
         return jsonify({"success": True, "message": "Candidate deleted successfully!"})
     
     except Exception as e:
@@ -458,12 +961,49 @@ def delete_candidate(candidate_id):
         cursor.close()
         conn.close()
 
+def bulk_moderate(table, changed):
+    # changed() drops the caches, only once the batch committed a change
+    action, ids = parse_batch(request.get_json(silent=True))
+    conn = get_db_connection()
+    try:
+        outcomes = moderate(conn, table, action, ids)
+    except Exception as e:
+        log.exception("bulk moderation failed", extra={"table": table, "action": action, "ids": len(ids)})
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+    if any(outcome not in ('unchanged', 'not_found') for outcome in outcomes.values()):
+        changed()
+
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    log.info("bulk moderation", extra={"table": table, "action": action, "counts": counts})
+    return jsonify({
+        "success": True,
+        "action": action,
+        "counts": counts,
+        "results": [{"id": row_id, "outcome": outcome} for row_id, outcome in outcomes.items()],
+    })
+
+# Body: {"action": "approve" | "reject" | "delete", "ids": [1, 2, ...]}
+@app.route('/admin/candidates/bulk', methods=['POST'])
+@app.route('/api/admin/candidates/bulk', methods=['POST'])
+@login_required(role='ADMIN')
+def bulk_moderate_candidates():
+    return bulk_moderate('candidates', candidates_changed)
+
+@app.route('/admin/partylists/bulk', methods=['POST'])
+@app.route('/api/admin/partylists/bulk', methods=['POST'])
+@login_required(role='ADMIN')
+def bulk_moderate_partylists():
+    return bulk_moderate('partylists', partylists_changed)
+
 @app.route('/submit-candidacy', methods=['POST'])
 @login_required()
 def submit_candidacy():
     data = request.json
-    
-    print("Received candidacy data:", data)  # Debug log
+    log.debug("candidacy received", extra={"candidacy": data})
     
     # Extract form data
     first_name = data.get('first_name')
@@ -478,6 +1018,12 @@ def submit_candidacy():
     
     # Photo is optional - set default or leave empty
     photo = data.get('photo', '')
+    if is_data_url(photo):
+        # Decoded once and stored by content hash; the row keeps the key
+        try:
+            photo = image_store.save_data_url(photo)
+        except InvalidImage as e:
+            return jsonify({"error": str(e)}), 400
     
     # Note: partylist_id is not stored in database
     # We only track affiliation_type (partylist or independent)
@@ -500,19 +1046,20 @@ def submit_candidacy():
         ))
         
         conn.commit()
-        print("Candidacy inserted successfully!")  # Debug log
+        candidates_changed()
+        log.info("candidacy submitted", extra={"student_id": student_id, "position": position})
         
         return jsonify({
             "success": True, 
             "message": "Candidacy application submitted successfully! Awaiting admin approval."
         }), 201
         
-    except mysql.connector.Error as e:
-        print("Database error:", str(e))  # Debug log
+    except storage.errors as e:
+        log.exception("could not save candidacy")
         return jsonify({"error": f"Database error: {str(e)}"}), 500
     
     except Exception as e:
-        print("General error:", str(e))  # Debug log
+        log.warning("invalid candidacy", extra={"error": str(e)})
         return jsonify({"error": str(e)}), 400
     
     finally:
@@ -521,7 +1068,7 @@ def submit_candidacy():
 
 @app.route('/get-partylists', methods=['GET'])
 def get_partylists():
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -536,8 +1083,8 @@ def get_partylists():
         partylists = cursor.fetchall()
         return jsonify(partylists)
     
-    except Exception as e:
-        print("Error fetching partylists:", str(e))
+    except Exception:
+        log.exception("could not fetch partylists")
         return jsonify([])
     
     finally:
@@ -548,8 +1095,7 @@ def get_partylists():
 @login_required()
 def submit_partylist():
     data = request.json
-    
-    print("Received partylist data:", data)
+    log.debug("partylist received", extra={"partylist": data})
     
     # Extract form data
     partylist_name = data.get('partylist_name')
@@ -576,29 +1122,50 @@ def submit_partylist():
         ))
         
         conn.commit()
-        print("Partylist registered successfully!")
+        partylists_changed()
+        log.info("partylist submitted", extra={"partylist_name": partylist_name})
         
         return jsonify({
             "success": True, 
             "message": "Partylist registration submitted successfully! Awaiting admin approval."
         }), 201
         
-    except mysql.connector.Error as e:
-        print("Database error:", str(e))
+    except storage.errors as e:
+        log.exception("could not save partylist")
         return jsonify({"error": f"Database error: {str(e)}"}), 500
     
     except Exception as e:
-        print("General error:", str(e))
+        log.warning("invalid partylist", extra={"error": str(e)})
         return jsonify({"error": str(e)}), 400
     
     finally:
         cursor.close()
         conn.close()
 
+@app.route('/admin/bulk-partylist', methods=['POST'])
+@app.route('/api/admin/bulk-partylist', methods=['POST'])
+@login_required(role='ADMIN')
+def bulk_partylist():
+    # Streams {"partylists": [...]} or a CSV upload; duplicates by name are skipped
+    rows = iter_request_rows(request, 'partylists')
+
+    conn = get_db_connection()
+    try:
+        report = run_import(conn, rows, normalize_partylist, insert_partylists,
+                            chunk_size=200, track_status=True)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+    partylists_changed()
+
+    status = 400 if report.fatal else 200
+    return jsonify(report.as_dict()), status
+
 @app.route('/get-pending-partylists', methods=['GET'])
 @login_required(role='ADMIN')
 def get_pending_partylists():
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
     cursor.execute("""
@@ -614,6 +1181,22 @@ def get_pending_partylists():
 
     return jsonify(rows)
 
+@app.route('/admin/partylists', methods=['GET'])
+@app.route('/api/admin/partylists', methods=['GET'])
+@login_required(role='ADMIN')
+def list_partylists():
+    conn = get_read_connection()
+    try:
+        return jsonify(list_page(conn, PARTYLIST_LISTING, request.args))
+    finally:
+        conn.close()
+
+@app.route('/admin/partylists/count', methods=['GET'])
+@app.route('/api/admin/partylists/count', methods=['GET'])
+@login_required(role='ADMIN')
+def count_partylists():
+    return jsonify({"total": count_rows(get_read_connection, PARTYLIST_LISTING, request.args)})
+
 @app.route('/approve-partylist/<int:partylist_id>', methods=['POST'])
 @login_required(role='ADMIN')
 def approve_partylist(partylist_id):
@@ -628,6 +1211,7 @@ def approve_partylist(partylist_id):
         """, (partylist_id,))
         
         conn.commit()
+        partylists_changed()
         return jsonify({"success": True, "message": "Partylist approved successfully!"})
     
     except Exception as e:
@@ -651,6 +1235,7 @@ def reject_partylist(partylist_id):
         """, (partylist_id,))
         
         conn.commit()
+        partylists_changed()
         return jsonify({"success": True, "message": "Partylist approval revoked!"})
     
     except Exception as e:
@@ -669,6 +1254,7 @@ def delete_partylist(partylist_id):
     try:
         cursor.execute("DELETE FROM partylists WHERE id = %s", (partylist_id,))
         conn.commit()
+        partylists_changed()
         return jsonify({"success": True, "message": "Partylist deleted successfully!"})
     
     except Exception as e:
@@ -678,6 +1264,43 @@ def delete_partylist(partylist_id):
         cursor.close()
         conn.close()
 
+# ----------------------------
+# Active sessions (admin)
+# ----------------------------
+
+@app.route('/admin/sessions', methods=['GET'])
+@app.route('/api/admin/sessions', methods=['GET'])
+@login_required(role='ADMIN')
+def list_sessions():
+    # The id is the store key (a hash of the cookie), never the cookie itself
+    return jsonify([
+        {
+            "id": key,
+            "user_id": data.get("user_id"),
+            "role": data.get("role"),
+            "created": data.get("created"),
+            "last_seen": data.get("last_seen"),
+            "expires_at": data.get("expires_at"),
+            "ip": data.get("ip"),
+            "user_agent": data.get("user_agent"),
+        }
+        for key, data in session_store.list_active()
+    ])
+
+@app.route('/admin/sessions/<session_id>', methods=['DELETE'])
+@app.route('/api/admin/sessions/<session_id>', methods=['DELETE'])
+@login_required(role='ADMIN')
+def revoke_session(session_id):
+    session_store.delete(session_id)
+    return jsonify({"success": True, "message": "Session revoked"})
+
+@app.route('/admin/users/<int:user_id>/sessions', methods=['DELETE'])
+@app.route('/api/admin/users/<int:user_id>/sessions', methods=['DELETE'])
+@login_required(role='ADMIN')
+def revoke_user_sessions(user_id):
+    revoked = session_store.revoke_user(user_id)
+    return jsonify({"success": True, "revoked": revoked})
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -693,7 +1316,7 @@ def get_user_profile():
     """Get the current user's profile data"""
     user_id = session.get('user_id')
     
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -711,7 +1334,7 @@ def get_user_profile():
         return jsonify(user)
     
     except Exception as e:
-        print("Error fetching user profile:", str(e))
+        log.exception("could not fetch user profile", extra={"user_id": user_id})
         return jsonify({"error": str(e)}), 500
     
     finally:
@@ -736,6 +1359,8 @@ def update_user_profile():
     conn = get_db_connection()
     cursor = conn.cursor()
     
+    password_changed = False
+    
     try:
         # If password is provided, update it; otherwise keep the old password
         if password and password.strip():
@@ -746,7 +1371,8 @@ def update_user_profile():
                 WHERE id = %s
             """
             cursor.execute(query, (firstname, middlename, lastname, email, 
-                                 yearlevel, department, password, user_id))
+                                 yearlevel, department, hash_password(password), user_id))
+            password_changed = True
         else:
             query = """
                 UPDATE accounts 
@@ -758,16 +1384,40 @@ def update_user_profile():
                                  yearlevel, department, user_id))
         
         conn.commit()
+        if password_changed:
+            # Sign out everywhere else
+            session_store.revoke_user(user_id, keep=session_key(session.token))
         return jsonify({"success": True, "message": "Profile updated successfully!"})
     
     except Exception as e:
-        print("Error updating user profile:", str(e))
+        log.exception("could not update user profile", extra={"user_id": user_id})
         return jsonify({"error": str(e)}), 500
     
     finally:
         cursor.close()
         conn.close()
 
+# Serve candidate photos. Keys are content hashes, so they never change.
+@app.route('/images/<size>/<name>')
+def serve_image(size, name):
+    found = image_store.resolve(name, size)
+    if not found:
+        return jsonify({"error": "Image not found"}), 404
+    directory, filename = found
+    response = send_from_directory(directory, filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Fingerprinted assets built by assets.py. Templates link them through
+# asset_url(), so a new build means new URLs and these never go stale.
+@app.template_global()
+def asset_url(filename):
+    return assets.url(app, filename)
+
+@app.route('/dist/<path:filename>')
+def serve_asset(filename):
+    return assets.send(filename)
+
 # Serve SVGs
 @app.route('/assets/svg/<path:filename>')
 def custom_static(filename):
@@ -790,6 +1440,5 @@ def userhome_html_redirect():
 # Run Flask
 # ----------------------------
 if __name__ == '__main__':
-    print("Running Flask app in folder:", os.getcwd())
-    print("Templates folder:", frontend_path)
+    log.info("running Flask dev server", extra={"cwd": os.getcwd(), "templates": frontend_path})
     app.run(debug=True)
\ No newline at end of file
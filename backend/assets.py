@@ -0,0 +1,150 @@
+"""Static asset build: fingerprinted, precompressed copies of the frontend.
+
+    python assets.py        # also run by check_connections.py and serve.py
+
+Every .css, .js and .svg under frontend/components and frontend/assets/svg
+is copied to ASSET_BUILD_DIR as name.<hash>.ext, with .gz (and .br when
+the brotli package is installed) next to it, and manifest.json maps the
+original names to the hashed ones. Templates call asset_url('voting.js');
+because the name changes whenever the content does, /dist/ responses can
+be cached by browsers for a year without ever going stale.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional; browsers fall back to gzip
+    brotli = None
+
+from flask import jsonify, request, send_from_directory, url_for
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCES = [
+    # (directory, manifest prefix)
+    (os.path.join(BASE_DIR, "..", "frontend", "components"), ""),
+    (os.path.join(BASE_DIR, "..", "frontend", "assets", "svg"), "svg/"),
+]
+EXTENSIONS = (".css", ".js", ".svg")
+HASH_LENGTH = 12
+MAX_AGE = 31536000
+
+
+# ---- build ----
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(out_dir):
+    """Build every asset; returns the manifest. Unchanged files are skipped."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for source_dir, prefix in SOURCES:
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            root, ext = os.path.splitext(name)
+            if ext.lower() not in EXTENSIONS:
+                continue
+            with open(os.path.join(source_dir, name), "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            hashed = f"{prefix}{root}.{digest}{ext}"
+            manifest[prefix + name] = hashed
+
+            target = os.path.join(out_dir, hashed)
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write(target, data)
+            # Only keep compressed variants that are actually smaller
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                _write(target + ".gz", compressed)
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    _write(target + ".br", compressed)
+
+    _write(os.path.join(out_dir, "manifest.json"),
+           json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+# ---- serving ----
+
+class Assets:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._manifest = None
+        self._loaded_mtime = None
+
+    def manifest(self):
+        # Reloaded when a rebuild replaces manifest.json
+        path = os.path.join(self.out_dir, "manifest.json")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        if mtime != self._loaded_mtime:
+            try:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+                self._loaded_mtime = mtime
+            except (OSError, ValueError):
+                log.warning("could not read asset manifest", extra={"path": path})
+                return self._manifest or {}
+        return self._manifest
+
+    def url(self, app, filename):
+        """Hashed URL for a frontend file; the plain one in debug or before a build."""
+        hashed = None if app.debug else self.manifest().get(filename)
+        if hashed is None:
+            if filename.startswith("svg/"):
+                return url_for("custom_static", filename=filename[len("svg/"):])
+            return url_for("static", filename=filename)
+        return url_for("serve_asset", filename=hashed)
+
+    def send(self, filename):
+        if filename.endswith((".gz", ".br")) or not os.path.isfile(os.path.join(self.out_dir, filename)):
+            return jsonify({"error": "Asset not found"}), 404
+        encodings = request.accept_encodings
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encodings[encoding] and os.path.isfile(os.path.join(self.out_dir, filename + suffix)):
+                response = send_from_directory(self.out_dir, filename + suffix,
+                                               mimetype=_mimetype(filename), max_age=MAX_AGE)
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(self.out_dir, filename, max_age=MAX_AGE)
+        response.headers["Cache-Control"] = f"public, max-age={MAX_AGE}, immutable"
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def _mimetype(filename):
+    if filename.endswith(".css"):
+        return "text/css"
+    if filename.endswith(".js"):
+        return "text/javascript"
+    if filename.endswith(".svg"):
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, BASE_DIR)
+    from config import ASSET_BUILD_DIR
+
+    built = build_assets(ASSET_BUILD_DIR)
+    print(f"Built {len(built)} assets into {ASSET_BUILD_DIR}")
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+
+from positions import position_name, position_number
+from responses import dumps
+
+
+# ----------------------------
+# Ballot cache
+# ----------------------------
+# /get-candidates returns the same document to every voter, and it only
+# changes when an admin moderates a candidate. The grouped ballot is built
+# once, serialized to JSON bytes and served from memory with an ETag.
+#
+# Routes that change candidates call invalidate(). Other worker processes
+# don't see that call, so entries also expire after max_age seconds.
+
+
+class BallotCache:
+    def __init__(self, connect, max_age=30.0):
+        self._connect = connect
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Only one request rebuilds at a time; the rest wait for its result.
+        self._build_lock = threading.Lock()
+        self._entry = None        # (expires_at, body, etag)
+        self._generation = 0
+
+    def get(self):
+        """Return (body_bytes, etag) for the current ballot."""
+        entry = self._entry
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+
+        with self._build_lock:
+            with self._lock:
+                entry = self._entry
+                if entry and entry[0] > time.monotonic():
+                    return entry[1], entry[2]
+                generation = self._generation
+
+            # A concurrent invalidate() bumps the generation, so a ballot
+            # built from rows read before the change is not stored.
+            body = dumps(self._build(), default=str)
+            etag = hashlib.sha1(body).hexdigest()
+
+            with self._lock:
+                if generation == self._generation:
+                    self._entry = (time.monotonic() + self.max_age, body, etag)
+            return body, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entry = None
+
+    def _build(self):
+        conn = self._connect()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT id, first_name, last_name, student_id, college, year_level,
+                       position, affiliation_type, platform
+                FROM candidates
+                WHERE approved = 1
+            """)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        for row in rows:
+            row['full_name'] = f"{row['first_name']} {row['last_name']}"
+            row['party'] = row['affiliation_type'].title() if row['affiliation_type'] else 'Independent'
+            row['position_name'] = position_name(row['position'])
+            row['position_int'] = position_number(row['position'])
+
+        rows.sort(key=lambda row: row['position_int'])
+
+        # Grouped by position name, in ballot order
+        data = {}
+        for row in rows:
+            data.setdefault(row['position_name'], []).append(row)
+        return data
@@ -0,0 +1,245 @@
+import sqlite3
+import uuid
+
+from positions import position_number
+from receipt_log import ballot_hash
+from tally import record_ballots
+
+
+# ----------------------------
+# Ballot writes
+# ----------------------------
+# A whole ballot is written in one transaction:
+#   1. one SELECT that validates every chosen candidate,
+#   2. one INSERT into voter_status (PRIMARY KEY user_id),
+#   3. one multi-row INSERT into votes,
+#   4. two upserts on the live tally counters (see tally.py),
+#   5. COMMIT.
+# voter_status also gets the ballot's hash, which the receipt log appends
+# to its Merkle tree shortly after (see receipt_log.py).
+#
+# In write-behind mode the ballot is journaled first and its voter_status
+# row is claimed (claim_ballot) before the voter is told it was accepted;
+# the flush then adds the votes and the ballot hash. A second ballot from
+# the same voter, on any worker, loses the claim and is never
+# acknowledged.
+# The voter_status primary key is what stops double voting; two concurrent
+# submissions for the same user cannot both insert the row, so there is no
+# check-then-insert race.
+
+
+class InvalidBallot(ValueError):
+    pass
+
+
+class DuplicateVote(Exception):
+    pass
+
+
+def is_duplicate_key_error(e):
+    # mysql.connector: ER_DUP_ENTRY; sqlite3: UNIQUE / PRIMARY KEY constraint
+    if getattr(e, 'errno', None) == 1062:
+        return True
+    return isinstance(e, sqlite3.IntegrityError) and 'UNIQUE constraint failed' in str(e)
+
+
+def parse_ballot(votes):
+    """Turn the voting page payload into a list of (position, candidate_id).
+
+    The payload is keyed by position name:
+        {"President": {"candidate_id": "12", ...}, ...}
+    """
+    if not isinstance(votes, dict) or not votes:
+        raise InvalidBallot("Ballot is empty.")
+
+    choices = []
+    for position, data in votes.items():
+        if not isinstance(data, dict) or 'candidate_id' not in data:
+            raise InvalidBallot(f"No candidate selected for {position}.")
+        try:
+            candidate_id = int(data['candidate_id'])
+        except (ValueError, TypeError):
+            raise InvalidBallot(f"Invalid candidate for {position}.")
+        choices.append((position_number(position), candidate_id))
+
+    candidate_ids = [candidate_id for _, candidate_id in choices]
+    if len(set(candidate_ids)) != len(candidate_ids):
+        raise InvalidBallot("A candidate was selected more than once.")
+    return choices
+
+
+def validate_choices(cursor, choices):
+    """Check every choice against approved candidates in a single query.
+
+    Returns [(candidate_id, position)] using the position stored on the
+    candidate, so the ballot cannot put a candidate under another position.
+    """
+    candidate_ids = [candidate_id for _, candidate_id in choices]
+    placeholders = ", ".join(["%s"] * len(candidate_ids))
+    cursor.execute(f"""
+        SELECT id, position FROM candidates
+        WHERE approved = 1 AND id IN ({placeholders})
+    """, candidate_ids)
+    approved = {row[0]: position_number(row[1]) for row in cursor.fetchall()}
+
+    rows = []
+    seen_positions = set()
+    for position, candidate_id in choices:
+        if candidate_id not in approved:
+            raise InvalidBallot(f"Candidate {candidate_id} is not on the ballot.")
+        actual = approved[candidate_id]
+        if actual != position:
+            raise InvalidBallot(f"Candidate {candidate_id} is not running for that position.")
+        if actual in seen_positions:
+            raise InvalidBallot("More than one candidate was selected for a position.")
+        seen_positions.add(actual)
+        rows.append((candidate_id, actual))
+    return rows
+
+
+def check_not_voted(cursor, user_id):
+    cursor.execute("SELECT 1 FROM voter_status WHERE user_id = %s", (user_id,))
+    if cursor.fetchone():
+        raise DuplicateVote("You have already voted!")
+
+
+def claim_ballot(conn, user_id, receipt):
+    """Reserve the user's one vote for a journaled ballot.
+
+    Raises DuplicateVote if another ballot already holds it. Claiming the
+    same receipt twice (or after its flush) is fine.
+    """
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute("""
+                INSERT INTO voter_status (user_id, receipt, voted_at)
+                VALUES (%s, %s, NOW())
+            """, (user_id, receipt))
+            conn.commit()
+            return
+        except Exception as e:
+            conn.rollback()
+            if not is_duplicate_key_error(e):
+                raise
+        cursor.execute("SELECT receipt FROM voter_status WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        if row is None or row[0] != receipt:
+            raise DuplicateVote("You have already voted!")
+    finally:
+        cursor.close()
+
+
+def write_ballot(conn, user_id, choices, receipt=None):
+    """Validate and store a ballot atomically. Returns the receipt id.
+
+    Raises InvalidBallot or DuplicateVote; the transaction is rolled back
+    in both cases.
+    """
+    receipt = receipt or uuid.uuid4().hex
+    cursor = conn.cursor()
+    try:
+        rows = validate_choices(cursor, choices)
+
+        try:
+            cursor.execute("""
+                INSERT INTO voter_status (user_id, receipt, ballot_hash, voted_at)
+                VALUES (%s, %s, %s, NOW())
+            """, (user_id, receipt, ballot_hash(receipt, rows)))
+        except Exception as e:
+            if is_duplicate_key_error(e):
+                raise DuplicateVote("You have already voted!")
+            raise
+
+        values = ", ".join(["(%s, %s, %s, NOW())"] * len(rows))
+        params = []
+        for candidate_id, position in rows:
+            params.extend((user_id, candidate_id, position))
+        cursor.execute(f"""
+            INSERT INTO votes (user_id, candidate_id, position, voted_at)
+            VALUES {values}
+        """, params)
+        record_ballots(cursor, [rows])
+
+        conn.commit()
+        return receipt
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def write_ballots_bulk(conn, ballots):
+    """Store many already-validated ballots in one transaction.
+
+    ballots is a list of dicts with user_id, receipt, voted_at and rows
+    [(candidate_id, position)]. Safe to call again with ballots that were
+    already stored (e.g. when a journal is replayed after a crash): a user
+    who already has a voter_status row with another receipt, or already has
+    votes, is skipped. A row claimed by claim_ballot with the same receipt
+    gets its votes and ballot hash. Returns (stored, rejected) lists of
+    receipts.
+    """
+    if not ballots:
+        return [], []
+    cursor = conn.cursor()
+    try:
+        user_ids = [b['user_id'] for b in ballots]
+        placeholders = ", ".join(["%s"] * len(user_ids))
+
+        # Users that already have votes rows were stored by an earlier flush.
+        cursor.execute(f"""
+            SELECT DISTINCT user_id FROM votes WHERE user_id IN ({placeholders})
+        """, user_ids)
+        already_stored = {row[0] for row in cursor.fetchall()}
+
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(ballots))
+        params = []
+        for b in ballots:
+            params.extend((b['user_id'], b['receipt'], ballot_hash(b['receipt'], b['rows']),
+                           b['voted_at']))
+        cursor.execute(f"""
+            INSERT IGNORE INTO voter_status (user_id, receipt, ballot_hash, voted_at)
+            VALUES {values}
+        """, params)
+
+        cursor.execute(f"""
+            SELECT user_id, receipt FROM voter_status WHERE user_id IN ({placeholders})
+        """, user_ids)
+        owner = dict(cursor.fetchall())
+
+        stored, rejected, vote_params, new_ballots, hashes = [], [], [], [], []
+        for b in ballots:
+            if owner.get(b['user_id']) != b['receipt']:
+                rejected.append(b['receipt'])
+                continue
+            stored.append(b['receipt'])
+            if b['user_id'] in already_stored:
+                continue
+            already_stored.add(b['user_id'])
+            new_ballots.append(b['rows'])
+            hashes.append((ballot_hash(b['receipt'], b['rows']), b['user_id']))
+            for candidate_id, position in b['rows']:
+                vote_params.extend((b['user_id'], candidate_id, position, b['voted_at']))
+
+        if vote_params:
+            values = ", ".join(["(%s, %s, %s, %s)"] * (len(vote_params) // 4))
+            cursor.execute(f"""
+                INSERT INTO votes (user_id, candidate_id, position, voted_at)
+                VALUES {values}
+            """, vote_params)
+            record_ballots(cursor, new_ballots)
+            # Claimed rows were inserted without it
+            cursor.executemany(
+                "UPDATE voter_status SET ballot_hash = %s WHERE user_id = %s AND ballot_hash IS NULL",
+                hashes,
+            )
+
+        conn.commit()
+        return stored, rejected
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,158 @@
+"""Ballots/sec for the old per-position vote path vs the batched one.
+
+Runs against a scratch database (default: vwise_vote_bench) on the MySQL
+server from config.py, created with the real migrations, so the real
+election data is never touched. The legacy path is measured without the
+tally counters it never had.
+
+    python benchmarks/bench_ballot_write.py --ballots 2000 --threads 16
+    python benchmarks/bench_ballot_write.py --backend sqlite   # data/vwise_vote_bench.sqlite3
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import DB_CONFIG, DB_BACKEND  # noqa: E402
+from storage import MySQLStorage, SqliteStorage, drop_tables  # noqa: E402
+from positions import POSITION_NAMES  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+import ballots  # noqa: E402
+
+
+# =========================
+# SETUP
+# =========================
+
+def scratch_storage(backend, database):
+    if backend == "sqlite":
+        return SqliteStorage(os.path.join(BACKEND_DIR, "data", f"{database}.sqlite3"))
+    return MySQLStorage(dict(DB_CONFIG, database=database))
+
+
+def prepare(storage, candidates_per_position):
+    conn = storage.create_database()
+    drop_tables(conn)
+    apply_migrations(conn, report=lambda message: None)
+    cursor = conn.cursor()
+    rows = []
+    for position in POSITION_NAMES:
+        for n in range(candidates_per_position):
+            rows.append((f"Cand{n}", f"Pos{position}", position))
+    cursor.executemany(
+        "INSERT INTO candidates (first_name, last_name, position, approved, created_at) "
+        "VALUES (%s, %s, %s, 1, NOW())",
+        rows,
+    )
+    conn.commit()
+
+    cursor.execute("SELECT id, position FROM candidates")
+    by_position = {}
+    for candidate_id, position in cursor.fetchall():
+        by_position.setdefault(position, []).append(candidate_id)
+    cursor.close()
+    conn.close()
+    return by_position
+
+
+def make_ballot(by_position, user_id):
+    return {
+        POSITION_NAMES[position]: {"candidate_id": ids[user_id % len(ids)]}
+        for position, ids in by_position.items()
+    }
+
+
+# =========================
+# WRITE PATHS
+# =========================
+
+def legacy_submit(conn, user_id, votes):
+    # The pre-batching submit_vote: a COUNT(*) and one INSERT per position.
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) AS count FROM votes WHERE user_id = %s", (user_id,))
+        if cursor.fetchone()[0] > 0:
+            return False
+        for position, data in votes.items():
+            cursor.execute("""
+                INSERT INTO votes (user_id, candidate_id, position, voted_at)
+                VALUES (%s, %s, %s, NOW())
+            """, (user_id, data["candidate_id"], ballots.position_number(position)))
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+
+
+def batched_submit(conn, user_id, votes):
+    try:
+        ballots.write_ballot(conn, user_id, ballots.parse_ballot(votes))
+        return True
+    except ballots.DuplicateVote:
+        return False
+
+
+# =========================
+# RUNNER
+# =========================
+
+def run(label, submit, storage, by_position, total, threads):
+    next_user = iter(range(1, total + 1))
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        conn = storage.connect()
+        try:
+            while True:
+                with lock:
+                    user_id = next(next_user, None)
+                if user_id is None:
+                    return
+                try:
+                    submit(conn, user_id, make_ballot(by_position, user_id))
+                except Exception as e:
+                    errors.append(e)
+                    conn.rollback()
+        finally:
+            conn.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<10} {total} ballots in {elapsed:.2f}s "
+          f"= {total / elapsed:,.0f} ballots/sec ({len(errors)} errors)")
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ballots", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--candidates", type=int, default=3, help="candidates per position")
+    parser.add_argument("--database", default=os.environ.get("VWISE_BENCH_DB", "vwise_vote_bench"))
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=DB_BACKEND)
+    args = parser.parse_args()
+
+    storage = scratch_storage(args.backend, args.database)
+    print(storage.describe())
+    by_position = prepare(storage, args.candidates)
+    before = run("legacy", legacy_submit, storage, by_position, args.ballots, args.threads)
+
+    prepare(storage, args.candidates)
+    after = run("batched", batched_submit, storage, by_position, args.ballots, args.threads)
+
+    print(f"speedup    {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
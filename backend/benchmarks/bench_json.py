@@ -0,0 +1,161 @@
+"""Serialization time and payload size for a large ballot.
+
+Builds a ballot of --candidates candidates shaped like /get-candidates
+(grouped by position, with platforms and photo URLs) and the flat list
+/get-pending-candidates returns, then compares:
+
+  * encoders: the json module as Flask used it (sorted keys) and
+    responses.dumps (orjson when installed);
+  * encodings: identity, gzip and brotli (when installed) at the levels
+    responses.py uses for dynamic bodies and at the maximum level;
+  * the whole-body encode against responses.stream_array.
+
+No database is needed.
+
+    python benchmarks/bench_json.py --candidates 500 --repeat 200
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+import responses  # noqa: E402
+from positions import POSITION_NAMES, position_name  # noqa: E402
+
+
+# =========================
+# DATA
+# =========================
+
+def words(rng, count):
+    return " ".join(
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        for _ in range(count)
+    )
+
+
+def make_candidates(count, seed=1):
+    rng = random.Random(seed)
+    positions = list(POSITION_NAMES)
+    started = datetime(2025, 1, 6, 8, 0, 0)
+    rows = []
+    for i in range(count):
+        position = positions[i % len(positions)]
+        photo = f"{i:064x}"
+        rows.append({
+            "id": i + 1,
+            "first_name": words(rng, 1).title(),
+            "last_name": words(rng, 1).title(),
+            "student_id": f"2021-{rng.randint(10000, 99999)}",
+            "email": f"student{i}@example.edu",
+            "college": rng.choice(["CCS", "CEA", "CAS", "CBA", "CED"]),
+            "year_level": rng.randint(1, 4),
+            "position": position,
+            "position_name": position_name(position),
+            "affiliation_type": rng.choice(["independent", "partylist", None]),
+            "party": "Independent",
+            "platform": words(rng, rng.randint(40, 120)),
+            "photo": f"/images/{photo}/medium.webp",
+            "photo_thumb": f"/images/{photo}/thumb.webp",
+            "photo_full": f"/images/{photo}/full.webp",
+            "approved": 1,
+            "created_at": started + timedelta(minutes=i),
+        })
+    return rows
+
+
+def group_ballot(rows):
+    ballot = {}
+    for row in rows:
+        ballot.setdefault(row["position_name"], []).append(row)
+    return ballot
+
+
+# =========================
+# MEASURE
+# =========================
+
+def best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def stdlib_dumps(obj):
+    # What Flask's default provider did: sorted keys, compact, str() fallback
+    return json.dumps(obj, default=str, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def fast_dumps(obj):
+    return responses.dumps(obj, default=str, sort_keys=True)
+
+
+def report(title, results):
+    print(f"\n{title}")
+    print(f"  {'variant':<34} {'ms':>9} {'bytes':>10}")
+    for name, ms, size in results:
+        print(f"  {name:<34} {ms:>9.3f} {size:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = make_candidates(args.candidates)
+    documents = {"ballot (/get-candidates)": group_ballot(rows),
+                 "list (/get-pending-candidates)": rows}
+
+    print(f"{args.candidates} candidates, best of {args.repeat}")
+    print(f"orjson: {'yes' if responses.orjson else 'no (json module)'}, "
+          f"brotli: {'yes' if responses.brotli else 'no'}")
+
+    for title, document in documents.items():
+        results = []
+        for name, encode in (("json module", stdlib_dumps), ("responses.dumps", fast_dumps)):
+            body = encode(document)
+            results.append((name, best_ms(lambda: encode(document), args.repeat), len(body)))
+
+        body = fast_dumps(document)
+        codecs = [
+            (f"gzip level {responses.GZIP_LEVEL}",
+             lambda: gzip.compress(body, compresslevel=responses.GZIP_LEVEL, mtime=0)),
+            ("gzip level 9", lambda: gzip.compress(body, compresslevel=9, mtime=0)),
+        ]
+        if responses.brotli is not None:
+            codecs += [
+                (f"brotli quality {responses.BROTLI_QUALITY}",
+                 lambda: responses.brotli.compress(body, quality=responses.BROTLI_QUALITY)),
+                ("brotli quality 11", lambda: responses.brotli.compress(body, quality=11)),
+            ]
+        for name, fn in codecs:
+            results.append(("+ " + name, best_ms(fn, args.repeat), len(fn())))
+
+        if isinstance(document, list):
+            for encoding in (None, "gzip", "br"):
+                if encoding == "br" and responses.brotli is None:
+                    continue
+
+                def streamed(encoding=encoding):
+                    return b"".join(responses.stream_array(document, str, True, encoding=encoding))
+
+                results.append((f"stream_array ({encoding or 'identity'})",
+                                 best_ms(streamed, args.repeat), len(streamed())))
+        report(title, results)
+
+
+if __name__ == "__main__":
+    main()
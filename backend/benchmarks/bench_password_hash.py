@@ -0,0 +1,109 @@
+"""Pick a password hash cost that keeps login p99 under a target.
+
+Simulates a login rush: --rate logins/sec arrive for --seconds, and each
+one needs a password verify on one of --workers processes (the number of
+server workers). For every candidate iteration count it reports the verify
+time and the p50/p95/p99 login latency including time spent queued, then
+recommends the highest cost that meets --target-ms.
+
+    python benchmarks/bench_password_hash.py --rate 300 --workers 8 --target-ms 250
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from credentials import hash_password, verify_password  # noqa: E402
+
+
+DEFAULT_COSTS = [10000, 30000, 60000, 120000, 250000, 600000]
+
+
+def verify_job(stored):
+    verify_password("correct horse battery staple", stored)
+    return time.perf_counter()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def single_verify_ms(stored, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        verify_password("correct horse battery staple", stored)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def simulate(pool, stored, rate, seconds):
+    total = int(rate * seconds)
+    interval = 1.0 / rate
+    start = time.perf_counter() + 0.05
+    scheduled, futures = [], []
+
+    for i in range(total):
+        due = start + i * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        scheduled.append(due)
+        futures.append(pool.submit(verify_job, stored))
+
+    latencies = sorted(
+        (future.result() - due) * 1000 for due, future in zip(scheduled, futures)
+    )
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200.0, help="logins per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="login p99 target")
+    parser.add_argument("--costs", type=int, nargs="*", default=DEFAULT_COSTS)
+    args = parser.parse_args()
+
+    print(f"{args.rate:.0f} logins/sec for {args.seconds:.0f}s on {args.workers} workers, "
+          f"p99 target {args.target_ms:.0f}ms\n")
+    print(f"{'iterations':>10} {'verify ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  ok")
+
+    best = None
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Start every worker before timing anything.
+        list(pool.map(verify_job, [hash_password("warmup", 1000)] * args.workers))
+
+        for cost in sorted(args.costs):
+            stored = hash_password("correct horse battery staple", cost)
+            verify_ms = single_verify_ms(stored)
+            # Skip costs the workers cannot keep up with at all.
+            if verify_ms / 1000 * args.rate > args.workers * 1.5:
+                print(f"{cost:>10} {verify_ms:>10.1f} {'-':>9} {'-':>9} {'-':>9}  no (saturated)")
+                continue
+            latencies = simulate(pool, stored, args.rate, args.seconds)
+            p99 = percentile(latencies, 99)
+            ok = p99 <= args.target_ms
+            if ok:
+                best = cost
+            print(f"{cost:>10} {verify_ms:>10.1f} {percentile(latencies, 50):>9.1f} "
+                  f"{percentile(latencies, 95):>9.1f} {p99:>9.1f}  {'yes' if ok else 'no'}")
+
+    print()
+    if best:
+        print(f"Recommended: VWISE_PASSWORD_HASH_ITERATIONS={best}")
+    else:
+        print("No tested cost meets the target; add workers or lower --costs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""Load test for the voting hot paths.
+
+Seeds a scratch database (default: vwise_vote_loadtest) on the MySQL server
+from config.py with --students accounts and --candidates per position,
+boots serve.py against it and replays election-day traffic:
+
+  * --voters concurrent voters, each one a student who logs in, loads the
+    ballot (--ballot-loads times, revalidating with If-None-Match), and
+    submits a vote, then hands over to the next student;
+  * --admins admins polling the live results and turnout every
+    --admin-interval seconds.
+
+Reports requests/sec, p50/p95/p99 latency and error rate per route. --json
+writes the report as a baseline; --compare prints the change against one.
+
+    python benchmarks/loadtest.py --students 5000 --voters 64 --json base.json
+    python benchmarks/loadtest.py --students 5000 --voters 64 --compare base.json
+
+--backend sqlite runs the same test on the embedded SQLite engine (a
+scratch file data/<database>.sqlite3, no MySQL server needed), so the two
+engines can be compared with --json / --compare.
+
+--url skips seeding and booting and runs against a server that is already
+up; its database must have been seeded by an earlier run (--seed-only).
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import DB_CONFIG, DB_BACKEND  # noqa: E402
+from positions import POSITION_NAMES  # noqa: E402
+from credentials import hash_password  # noqa: E402
+
+PASSWORD = "loadtest-password"
+ADMIN_NUMBER = "LT-ADMIN"
+
+
+def student_number(n):
+    return f"LT{n:07d}"
+
+
+# =========================
+# SETUP
+# =========================
+
+def scratch_storage(backend, database):
+    from storage import MySQLStorage, SqliteStorage
+
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_path(database))
+    return MySQLStorage(dict(DB_CONFIG, database=database))
+
+
+def sqlite_path(database):
+    return os.path.join(BACKEND_DIR, "data", f"{database}.sqlite3")
+
+
+def seed(storage, students, candidates_per_position):
+    from migrations import apply_migrations
+    from storage import drop_tables
+
+    conn = storage.create_database()
+    drop_tables(conn)
+    apply_migrations(conn, report=lambda message: None)
+    cursor = conn.cursor()
+
+    # One hash at the real cost, shared by every account: logins pay the
+    # production verify time without seeding taking hours.
+    stored = hash_password(PASSWORD)
+    rows = [("Load", "Test", student_number(n), 1, "CCS", stored)
+            for n in range(1, students + 1)]
+    rows.append(("Load", "Admin", ADMIN_NUMBER, None, "ADMIN", stored))
+    for start in range(0, len(rows), 1000):
+        cursor.executemany(
+            "INSERT INTO accounts (firstname, lastname, studentNumber, yearlevel, department, password) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            rows[start:start + 1000],
+        )
+
+    cursor.executemany(
+        "INSERT INTO candidates (first_name, last_name, college, position, approved, created_at) "
+        "VALUES (%s, %s, 'CCS', %s, 1, NOW())",
+        [(f"Cand{n}", f"Pos{position}", position)
+         for position in POSITION_NAMES for n in range(candidates_per_position)],
+    )
+    # Voting is only accepted inside an open election (election.py)
+    cursor.execute("UPDATE election_settings SET status = 'active', version = version + 1 WHERE id = 1")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def boot_server(backend, database, port, workers):
+    env = dict(os.environ,
+               VWISE_DB_BACKEND=backend,
+               VWISE_DB_NAME=database,
+               VWISE_SQLITE_PATH=sqlite_path(database),
+               VWISE_BIND=f"127.0.0.1:{port}",
+               VWISE_WORKERS=str(workers))
+    process = subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"serve.py exited with code {process.returncode}")
+        try:
+            if Client(url).request("GET", "/ready")[0] == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("server did not become ready within 60s")
+
+
+# =========================
+# CLIENT
+# =========================
+
+class Client:
+    """One keep-alive connection with its own session cookie."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+        self.cookie = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return response.status, response.getheader("ETag"), data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def timed(self, route, client, method, path, ok_statuses, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, etag, data = client.request(method, path, **kwargs)
+            ok = status in ok_statuses
+        except (OSError, http.client.HTTPException):
+            status, etag, data, ok = None, None, b"", False
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return status, etag, data
+
+
+# =========================
+# SCENARIOS
+# =========================
+
+def make_ballot(ballot, n):
+    return {
+        position: {"candidate_id": candidates[n % len(candidates)]["id"]}
+        for position, candidates in ballot.items()
+    }
+
+
+def voter(url, recorder, next_student, stop, ballot_loads):
+    while not stop.is_set():
+        n = next_student()
+        if n is None:
+            return
+        client = Client(url)
+        try:
+            body = urlencode({"studentNumber": student_number(n), "password": PASSWORD})
+            status, _, _ = recorder.timed(
+                "POST /login", client, "POST", "/login", (302,), body=body,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            if status != 302:
+                continue
+
+            ballot, etag = None, None
+            for _ in range(ballot_loads):
+                headers = {"If-None-Match": f'"{etag}"'} if etag else {}
+                status, new_etag, data = recorder.timed(
+                    "GET /get-candidates", client, "GET", "/get-candidates", (200, 304),
+                    headers=headers,
+                )
+                if status == 200:
+                    ballot, etag = json.loads(data), (new_etag or "").strip('"')
+            if not ballot:
+                continue
+
+            recorder.timed(
+                "POST /submit-vote", client, "POST", "/submit-vote", (200,),
+                body=json.dumps(make_ballot(ballot, n)),
+                headers={"Content-Type": "application/json"},
+            )
+        finally:
+            client.close()
+
+
+def admin(url, recorder, stop, interval):
+    client = Client(url)
+    body = urlencode({"studentNumber": ADMIN_NUMBER, "password": PASSWORD})
+    recorder.timed("POST /login", client, "POST", "/login", (302,), body=body,
+                   headers={"Content-Type": "application/x-www-form-urlencoded"})
+    while not stop.is_set():
+        recorder.timed("GET /admin/results/detailed", client, "GET",
+                       "/api/admin/results/detailed", (200,))
+        recorder.timed("GET /turnout", client, "GET", "/api/turnout", (200,))
+        stop.wait(interval)
+    client.close()
+
+
+# =========================
+# REPORT
+# =========================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_report(recorder, elapsed, args):
+    routes = {}
+    for route, values in sorted(recorder.latencies.items()):
+        values.sort()
+        errors = recorder.errors.get(route, 0)
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "settings": {
+            "students": args.students, "voters": args.voters, "admins": args.admins,
+            "ballot_loads": args.ballot_loads, "workers": args.workers, "backend": args.backend,
+        },
+        "routes": routes,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'route':<30} {'reqs':>7} {'err%':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report["routes"].items():
+        print(f"{route:<30} {r['requests']:>7} {r['error_rate'] * 100:>5.1f}% {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+        old = (baseline or {}).get("routes", {}).get(route)
+        if old:
+            def change(key):
+                return f"{(r[key] - old[key]) / old[key] * 100:+.0f}%" if old[key] else "-"
+            print(f"{'  vs baseline':<30} {'':>7} {'':>6} {change('rps'):>8} "
+                  f"{change('p50_ms'):>8} {change('p95_ms'):>8} {change('p99_ms'):>8}")
+    print(f"\n{report['elapsed_seconds']}s elapsed")
+
+
+# =========================
+# MAIN
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--candidates", type=int, default=3, help="candidates per position")
+    parser.add_argument("--voters", type=int, default=32, help="concurrent voters")
+    parser.add_argument("--admins", type=int, default=2, help="admins polling results")
+    parser.add_argument("--admin-interval", type=float, default=2.0)
+    parser.add_argument("--ballot-loads", type=int, default=2, help="ballot fetches per voter")
+    parser.add_argument("--duration", type=float, default=0, help="stop after N seconds (0: all students)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="server workers")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--database", default=os.environ.get("VWISE_BENCH_DB", "vwise_vote_loadtest"))
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--url", help="run against an already running server")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if not url:
+        storage = scratch_storage(args.backend, args.database)
+        print(f"Seeding {storage.describe()}: {args.students} students, "
+              f"{args.candidates} candidates per position")
+        seed(storage, args.students, args.candidates)
+        if args.seed_only:
+            return
+        process, url = boot_server(args.backend, args.database, args.port, args.workers)
+
+    students = iter(range(1, args.students + 1))
+    students_lock = threading.Lock()
+
+    def next_student():
+        with students_lock:
+            return next(students, None)
+
+    recorder = Recorder()
+    stop = threading.Event()
+    voters = [threading.Thread(target=voter, args=(url, recorder, next_student, stop, args.ballot_loads))
+              for _ in range(args.voters)]
+    admins = [threading.Thread(target=admin, args=(url, recorder, stop, args.admin_interval))
+              for _ in range(args.admins)]
+
+    print(f"Running {args.voters} voters and {args.admins} admins against {url}")
+    started = time.perf_counter()
+    try:
+        for t in voters + admins:
+            t.start()
+        if args.duration:
+            stop.wait(args.duration)
+            stop.set()
+        for t in voters:
+            t.join()
+        stop.set()
+        for t in admins:
+            t.join()
+    finally:
+        elapsed = time.perf_counter() - started
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = build_report(recorder, elapsed, args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Report written to", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import codecs
+import csv
+import io
+import json
+import re
+from datetime import datetime
+
+from config import BULK_PASSWORD_HASH_ITERATIONS
+from credentials import hash_password
+
+
+# ----------------------------
+# Streaming bulk import
+# ----------------------------
+# Bulk endpoints read the request body as a stream and never hold the whole
+# upload in memory: rows are parsed one at a time, validated, collected
+# into chunks of CHUNK_SIZE and written with one multi-row INSERT per chunk,
+# each chunk in its own transaction. Only failed rows are reported back,
+# and the report itself is capped at MAX_REPORTED_ERRORS.
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+# ---- readers ----
+
+def iter_json_array(stream, key):
+    """Yield the items of body[key] (or of a top-level array) one by one."""
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + reader.decode(b'', final=True)
+        else:
+            buf = buf[pos:] + reader.decode(chunk)
+        pos = 0
+
+    # Find the opening bracket of the array.
+    pattern = re.compile(r'^\s*\[') if key is None else re.compile(
+        r'"' + re.escape(key) + r'"\s*:\s*\['
+    )
+    while True:
+        match = pattern.search(buf, pos)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            raise BulkImportError(f'Request body has no "{key}" list.')
+        # Keep a tail in case the key is split across reads.
+        keep = len(key or '') + 16
+        pos = max(0, len(buf) - keep)
+        fill()
+
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+        if pos >= len(buf):
+            raise BulkImportError("Request body ended inside the list.")
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise BulkImportError("Request body is not valid JSON.")
+            fill()
+            continue
+        if end == len(buf) and not eof:
+            # A number may continue in the next read; parse it again then.
+            fill()
+            continue
+        pos = end
+        yield item
+
+
+def iter_csv_rows(stream):
+    """Yield one dict per CSV line, keyed by the header row."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+
+def iter_request_rows(request, key):
+    """Rows from an uploaded CSV file, a text/csv body or a JSON body."""
+    upload = request.files.get('file')
+    if upload is not None:
+        # Werkzeug spools large uploads to a temporary file.
+        return iter_csv_rows(upload.stream)
+    if request.mimetype == 'text/csv':
+        return iter_csv_rows(request.stream)
+    return iter_json_array(request.stream, key)
+
+
+def pick(row, *names):
+    """First non-empty value among several spellings of a column."""
+    for name in names:
+        value = row.get(name)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '' or value == 'undefined':
+                continue
+        return value
+    return None
+
+
+# ---- driver ----
+
+# Per-row status codes for the compact report
+STATUS_CREATED = 'c'
+STATUS_DUPLICATE = 'd'
+STATUS_ERROR = 'e'
+
+
+class ImportReport:
+    def __init__(self, track_status=False):
+        self.success_count = 0
+        self.error_count = 0
+        self.errors = []
+        # Set when the upload itself is unreadable; earlier chunks stay committed.
+        self.fatal = None
+        # One byte per row, in upload order, when track_status is set.
+        self.status = bytearray() if track_status else None
+
+    def mark(self, row_number, code):
+        if self.status is None:
+            return
+        if len(self.status) < row_number:
+            self.status.extend(b'?' * (row_number - len(self.status)))
+        self.status[row_number - 1] = ord(code)
+
+    def created(self, row_number):
+        self.success_count += 1
+        self.mark(row_number, STATUS_CREATED)
+
+    def error(self, row_number, identifier, message, code=STATUS_ERROR):
+        self.error_count += 1
+        self.mark(row_number, code)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "id": identifier, "error": message})
+
+    def as_dict(self):
+        data = {
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+        if self.status is not None:
+            data["status"] = self.status.decode('ascii')
+        if self.fatal:
+            data["error"] = self.fatal
+        return data
+
+
+def run_import(conn, rows, normalize, insert_chunk, chunk_size=CHUNK_SIZE, track_status=False):
+    """Validate rows one at a time and insert them chunk by chunk.
+
+    normalize(row) returns a tuple of column values or raises RowError.
+    insert_chunk(conn, chunk, report) writes a list of (row_number, values).
+    """
+    report = ImportReport(track_status)
+    chunk = []
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                report.error(row_number, None, "Row is not an object.")
+                continue
+            try:
+                values = normalize(row)
+            except RowError as e:
+                report.error(row_number, None, str(e))
+                continue
+            chunk.append((row_number, values))
+            if len(chunk) >= chunk_size:
+                insert_chunk(conn, chunk, report)
+                chunk = []
+    except (BulkImportError, UnicodeDecodeError, csv.Error) as e:
+        report.fatal = str(e)
+    if chunk:
+        insert_chunk(conn, chunk, report)
+    return report
+
+
+def existing_values(cursor, table, column, values):
+    # Case-insensitive on every backend. MySQL's default collation already
+    # is, and a plain IN keeps the unique index; SQLite compares as is.
+    values = sorted({str(value).lower() for value in values})
+    placeholders = ", ".join(["%s"] * len(values))
+    key = f"LOWER({column})" if getattr(cursor, "dialect", None) == "sqlite" else column
+    cursor.execute(f"SELECT {column} FROM {table} WHERE {key} IN ({placeholders})", values)
+    return {str(row[0]).lower() for row in cursor.fetchall()}
+
+
+def insert_rows(conn, report, table, columns, chunk, key_index, label):
+    """Insert a chunk, skipping keys already in the table or repeated.
+
+    Falls back to one row at a time if the multi-row insert fails, so a
+    bad row only costs its own insert and gets its own error.
+    """
+    cursor = conn.cursor()
+    try:
+        keys = {values[key_index] for _, values in chunk}
+        taken = existing_values(cursor, table, columns[key_index], keys)
+        fresh = []
+        for row_number, values in chunk:
+            key = values[key_index]
+            if key.lower() in taken:
+                report.error(row_number, key, f"{label} already exists.", STATUS_DUPLICATE)
+                continue
+            taken.add(key.lower())
+            fresh.append((row_number, values))
+        if not fresh:
+            return
+
+        column_list = ", ".join(columns)
+        row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        try:
+            params = [v for _, values in fresh for v in values]
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) VALUES " + ", ".join([row_sql] * len(fresh)),
+                params,
+            )
+            conn.commit()
+            for row_number, _ in fresh:
+                report.created(row_number)
+            return
+        except Exception:
+            conn.rollback()
+
+        for row_number, values in fresh:
+            try:
+                cursor.execute(f"INSERT INTO {table} ({column_list}) VALUES {row_sql}", values)
+                conn.commit()
+                report.created(row_number)
+            except Exception as e:
+                conn.rollback()
+                report.error(row_number, values[key_index], str(e))
+    finally:
+        cursor.close()
+
+
+# ---- accounts ----
+
+ACCOUNT_COLUMNS = (
+    "firstname", "middlename", "lastname", "email",
+    "studentNumber", "yearlevel", "department", "password",
+)
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def normalize_account(row):
+    """Accepts adminhome.html's upload format, add_account's and CSV headers."""
+    student_number = pick(row, 'studentNumber', 'student_id', 'Student ID')
+    if student_number is None:
+        raise RowError("Missing student ID.")
+    student_number = str(student_number)
+
+    firstname = pick(row, 'firstname', 'first_name', 'First Name')
+    middlename = pick(row, 'middlename', 'middle_name', 'Middle Name')
+    lastname = pick(row, 'lastname', 'last_name', 'Last Name')
+    if not (firstname and lastname):
+        full_name = pick(row, 'full_name', 'Full Name')
+        parts = [p for p in (full_name or '').split() if p != 'undefined']
+        if len(parts) < 2:
+            raise RowError(f"Missing name for {student_number}.")
+        firstname, lastname = parts[0], parts[-1]
+        middlename = " ".join(parts[1:-1]) or None
+
+    email = pick(row, 'email', 'Student Email', 'Email')
+    if email is not None and not _EMAIL.match(str(email)):
+        raise RowError(f"Invalid email for {student_number}.")
+
+    yearlevel = pick(row, 'yearlevel', 'year_level', 'Year Level')
+    if yearlevel is not None:
+        try:
+            yearlevel = int(yearlevel)
+        except (ValueError, TypeError):
+            raise RowError(f"Invalid year level for {student_number}.")
+
+    department = pick(row, 'department', 'Department')
+    if department and str(department).strip().upper() == 'ADMIN':
+        raise RowError("Admin accounts cannot be bulk registered.")
+
+    # adminhome.html uses the student ID as the initial password. Hashed at a
+    # low cost so 50k rows import quickly; upgraded on first login.
+    password = pick(row, 'password', 'Password') or student_number
+    password = hash_password(str(password), BULK_PASSWORD_HASH_ITERATIONS)
+
+    return (firstname, middlename, lastname, email, student_number, yearlevel, department, password)
+
+
+def insert_accounts(conn, chunk, report):
+    insert_rows(conn, report, "accounts", ACCOUNT_COLUMNS, chunk,
+                ACCOUNT_COLUMNS.index("studentNumber"), "Student ID")
+
+
+# ---- partylists ----
+
+PARTYLIST_COLUMNS = (
+    "partylist_name", "platform", "president_name", "president_student_id",
+    "contact_email", "contact_number", "approved", "created_at",
+)
+
+
+def normalize_partylist(row):
+    """Accepts submit_partylist's fields and the partylist template headers."""
+    name = pick(row, 'partylist_name', 'Name of Partylist', 'name')
+    if name is None:
+        raise RowError("Missing partylist name.")
+    name = " ".join(str(name).split())
+    if len(name) > 255:
+        raise RowError("Partylist name is too long.")
+
+    contact_email = pick(row, 'contact_email', 'Contact Email', 'Email')
+    if contact_email is not None and not _EMAIL.match(str(contact_email)):
+        raise RowError(f"Invalid contact email for {name}.")
+
+    return (
+        name,
+        pick(row, 'platform', 'Slogan', 'Platform'),
+        pick(row, 'president_name', 'President'),
+        pick(row, 'president_student_id', 'President Student ID'),
+        contact_email,
+        pick(row, 'contact_number', 'Contact Number') or '',
+        # Uploaded by an admin, so already approved
+        1,
+        datetime.now(),
+    )
+
+
+def insert_partylists(conn, chunk, report):
+    insert_rows(conn, report, "partylists", PARTYLIST_COLUMNS, chunk,
+                PARTYLIST_COLUMNS.index("partylist_name"), "Partylist")
@@ -4,25 +4,31 @@ import subprocess
 import socket
 import time
 
+from config import DB_CONFIG, DB_BACKEND, SQLITE_DB_PATH, SQLITE_SYNCHRONOUS, SERVER_BIND
+
 # =========================
 # CONFIGURATION
 # =========================
 
 REQUIRED_PACKAGES = {
     "flask": "flask",
-    "mysql-connector-python": "mysql.connector",
     "flask-cors": "flask_cors",
+    # Candidate photo thumbnails (image_store.py); without it every size
+    # serves the full upload
+    "pillow": "PIL",
 }
 
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "",
-    "database": "vwise_vote",
-}
+# Only needed for the MySQL backend; SQLite ships with Python.
+MYSQL_PACKAGES = {"mysql-connector-python": "mysql.connector"}
+
+# Only needed for the production server (--prod); see serve.py.
+PROD_PACKAGES = (
+    {"waitress": "waitress"} if os.name == "nt" else {"gunicorn": "gunicorn"}
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 APP_FILE = os.path.join(BASE_DIR, "app.py")
+SERVE_FILE = os.path.join(BASE_DIR, "serve.py")
 FRONTEND_COMPONENTS = os.path.abspath(
     os.path.join(BASE_DIR, "..", "frontend", "components")
 )
@@ -51,11 +57,17 @@ def run_command(cmd):
 # CHECKS
 # =========================
 
-def ensure_packages():
+def ensure_packages(prod=False):
     print_header("Checking Python Packages")
     missing = []
 
-    for pip_name, import_name in REQUIRED_PACKAGES.items():
+    packages = dict(REQUIRED_PACKAGES)
+    if DB_BACKEND == "mysql":
+        packages.update(MYSQL_PACKAGES)
+    if prod:
+        packages.update(PROD_PACKAGES)
+
+    for pip_name, import_name in packages.items():
         try:
             __import__(import_name)
             print(f"✔ {pip_name}")
@@ -81,26 +93,27 @@ def ensure_packages():
     return True
 
 
-def check_mysql_connection():
-    print_header("Checking MySQL Connection")
-    try:
-        import mysql.connector
+def get_storage():
+    from storage import make_storage
+    return make_storage(DB_BACKEND, DB_CONFIG, SQLITE_DB_PATH, SQLITE_SYNCHRONOUS)
+
 
-        conn = mysql.connector.connect(
-            connection_timeout=5,
-            **DB_CONFIG
-        )
+def check_database_connection():
+    storage = get_storage()
+    print_header(f"Checking Database Connection ({storage.describe()})")
+    try:
+        conn = storage.connect()
         cursor = conn.cursor()
         cursor.execute("SELECT 1")
         cursor.fetchone()  # IMPORTANT
         cursor.close()
         conn.close()
 
-        print("✔ MySQL connection successful.")
+        print("✔ Database connection successful.")
         return True
 
-    except mysql.connector.Error as e:
-        print("✖ MySQL error:", e)
+    except storage.errors as e:
+        print("✖ Database error:", e)
         return False
 
     except Exception as e:
@@ -108,6 +121,29 @@ def check_mysql_connection():
         return False
 
 
+def apply_schema_migrations():
+    print_header("Applying Database Migrations")
+    try:
+        from migrations import apply_migrations, current_version, LATEST_VERSION
+
+        # Creates the MySQL database, or the SQLite file, on a fresh install
+        conn = get_storage().create_database()
+
+        applied = apply_migrations(conn)
+        version = current_version(conn)
+        conn.close()
+
+        if applied:
+            print(f"✔ Applied {len(applied)} migration(s); schema is at version {version}.")
+        else:
+            print(f"✔ Schema is up to date (version {version}).")
+        return version == LATEST_VERSION
+
+    except Exception as e:
+        print("✖ Migration failed:", e)
+        return False
+
+
 def check_paths():
     print_header("Checking Required Files & Folders")
     ok = True
@@ -120,12 +156,28 @@ def check_paths():
             ok = False
 
     check(APP_FILE, "file")
+    check(SERVE_FILE, "file")
     check(FRONTEND_COMPONENTS, "dir")
     check(ASSETS_SVG, "dir")
 
     return ok
 
 
+def build_static_assets():
+    print_header("Building Static Assets")
+    try:
+        from assets import build_assets
+        from config import ASSET_BUILD_DIR
+
+        manifest = build_assets(ASSET_BUILD_DIR)
+        print(f"✔ {len(manifest)} assets fingerprinted into {ASSET_BUILD_DIR}")
+        return True
+    except Exception as e:
+        # Templates fall back to the plain /static URLs
+        print("✖ Asset build failed:", e)
+        return False
+
+
 def check_port_free(port):
     print_header(f"Checking Port {port}")
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -142,12 +194,15 @@ def check_port_free(port):
 # APP RUNNER
 # =========================
 
-def run_app():
-    print_header("Starting Flask App")
+def run_app(prod=False):
+    # --prod runs the multi-worker production server instead of the
+    # Flask development server.
+    script = "serve.py" if prod else "app.py"
+    print_header("Starting Production Server" if prod else "Starting Flask App")
     print("Using Python:", sys.executable)
 
     process = subprocess.Popen(
-        [sys.executable, "app.py"],
+        [sys.executable, script],
         cwd=BASE_DIR,
         env=os.environ.copy(),
     )
@@ -169,21 +224,27 @@ def run_app():
 
 def main():
     no_run = "--no-run" in sys.argv
+    prod = "--prod" in sys.argv
 
     print_header("Environment Check")
     print("Python executable:", sys.executable)
     print("Python version:", sys.version.split()[0])
 
-    if not ensure_packages():
+    if not ensure_packages(prod):
         return
 
     paths_ok = check_paths()
-    db_ok = check_mysql_connection()
-    port_ok = check_port_free(FLASK_PORT)
+    schema_ok = apply_schema_migrations()
+    db_ok = schema_ok and check_database_connection()
+    assets_ok = build_static_assets()
+    port = int(SERVER_BIND.rsplit(":", 1)[1]) if prod else FLASK_PORT
+    port_ok = check_port_free(port)
 
     print_header("Summary")
     print("Files & folders OK :", paths_ok)
+    print("Schema up to date  :", schema_ok)
     print("Database OK        :", db_ok)
+    print("Assets built       :", assets_ok)
     print("Port free          :", port_ok)
 
     if not (paths_ok and db_ok):
@@ -199,7 +260,7 @@ def main():
         if resp not in ("y", "yes"):
             return
 
-    run_app()
+    run_app(prod)
 
 
 if __name__ == "__main__":
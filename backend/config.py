@@ -0,0 +1,188 @@
+import os
+
+# =========================
+# CONFIGURATION
+# =========================
+# Every setting can be overridden with an environment variable so the same
+# code runs on a laptop, a polling station and the election-day server.
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+DB_CONFIG = {
+    "host": os.environ.get("VWISE_DB_HOST", "localhost"),
+    "port": env_int("VWISE_DB_PORT", 3306),
+    "user": os.environ.get("VWISE_DB_USER", "root"),
+    "password": os.environ.get("VWISE_DB_PASSWORD", ""),
+    "database": os.environ.get("VWISE_DB_NAME", "vwise_vote"),
+}
+
+# Connection pool
+# Maximum number of open connections this process may hold.
+DB_POOL_SIZE = env_int("VWISE_DB_POOL_SIZE", 10)
+# Seconds a request waits for a free connection before giving up.
+DB_POOL_TIMEOUT = env_float("VWISE_DB_POOL_TIMEOUT", 5.0)
+# Connections idle longer than this are pinged before being handed out.
+DB_POOL_PING_AFTER = env_float("VWISE_DB_POOL_PING_AFTER", 30.0)
+# Connections older than this are closed and replaced.
+DB_POOL_RECYCLE = env_float("VWISE_DB_POOL_RECYCLE", 3600.0)
+
+# Write-behind vote queue
+# When enabled, submit_vote journals the ballot to a local fsync'd log and
+# returns; a background flusher loads the queue into MySQL in batches.
+VOTE_WRITE_BEHIND = env_bool("VWISE_VOTE_WRITE_BEHIND", False)
+VOTE_LOG_DIR = os.environ.get(
+    "VWISE_VOTE_LOG_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vote_log"),
+)
+# How long the journal waits to gather more ballots into one fsync.
+VOTE_FSYNC_WINDOW = env_float("VWISE_VOTE_FSYNC_WINDOW", 0.005)
+# Ballots per flush transaction and the longest a ballot waits to be flushed.
+VOTE_FLUSH_BATCH = env_int("VWISE_VOTE_FLUSH_BATCH", 500)
+VOTE_FLUSH_INTERVAL = env_float("VWISE_VOTE_FLUSH_INTERVAL", 0.5)
+
+# Ballot cache
+# Upper bound on how long another worker may serve a ballot after an admin
+# change; the worker that handled the change refreshes immediately.
+BALLOT_CACHE_MAX_AGE = env_float("VWISE_BALLOT_CACHE_MAX_AGE", 30.0)
+
+# Candidate photo store (content-addressed files, see image_store.py)
+IMAGE_STORE_DIR = os.environ.get(
+    "VWISE_IMAGE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "images"),
+)
+
+# Password hashing (PBKDF2-SHA256). Pick the cost with
+# benchmarks/bench_password_hash.py; stored hashes below it are upgraded on
+# the user's next successful login.
+PASSWORD_HASH_ITERATIONS = env_int("VWISE_PASSWORD_HASH_ITERATIONS", 120000)
+# Cost used by bulk registration, where the initial password is the student
+# ID anyway; these are upgraded to the full cost on first login.
+BULK_PASSWORD_HASH_ITERATIONS = env_int("VWISE_BULK_PASSWORD_HASH_ITERATIONS", 1000)
+
+# Production server (serve.py, or `check_connections.py --prod`)
+SERVER_BIND = os.environ.get("VWISE_BIND", "0.0.0.0:5000")
+# Worker processes; defaults to one per CPU core.
+SERVER_WORKERS = env_int("VWISE_WORKERS", os.cpu_count() or 1)
+# Request threads inside each worker.
+SERVER_THREADS = env_int("VWISE_THREADS", 4)
+# Seconds a worker may take to finish in-flight requests on restart/stop.
+SERVER_GRACEFUL_TIMEOUT = env_int("VWISE_GRACEFUL_TIMEOUT", 30)
+# Recycle each worker after roughly this many requests (0 disables).
+SERVER_MAX_REQUESTS = env_int("VWISE_MAX_REQUESTS", 10000)
+# Connections MySQL may give this server in total (max_connections minus
+# headroom for admin tools); split evenly between the workers.
+DB_MAX_CONNECTIONS = env_int("VWISE_DB_MAX_CONNECTIONS", 100)
+
+# Metrics (/metrics). When set, scrapers must send "Authorization: Bearer <token>".
+METRICS_TOKEN = os.environ.get("VWISE_METRICS_TOKEN", "")
+
+# Logging (see logs.py)
+LOG_LEVEL = os.environ.get("VWISE_LOG_LEVEL", "INFO")
+# "json" (one object per line) or "text"
+LOG_FORMAT = os.environ.get("VWISE_LOG_FORMAT", "json")
+# Share of sampled hot-route INFO records (logins, votes) that are kept.
+LOG_SAMPLE_RATE = env_float("VWISE_LOG_SAMPLE_RATE", 0.01)
+# Records buffered for the writer thread; beyond this they are dropped.
+LOG_QUEUE_SIZE = env_int("VWISE_LOG_QUEUE_SIZE", 10000)
+
+# Sessions (see sessions.py). "sqlite" shares sessions between workers and
+# restarts; "memory" keeps them in the process (development only).
+SESSION_BACKEND = os.environ.get("VWISE_SESSION_BACKEND", "sqlite")
+SESSION_DB_PATH = os.environ.get(
+    "VWISE_SESSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sessions.sqlite3"),
+)
+# Idle sessions expire after this many seconds.
+SESSION_TTL = env_int("VWISE_SESSION_TTL", 12 * 3600)
+# Sessions cached per worker, and how long before a cached one is re-read
+# (the longest a session revoked in another worker stays usable there).
+SESSION_CACHE_SIZE = env_int("VWISE_SESSION_CACHE_SIZE", 10000)
+SESSION_CACHE_SECONDS = env_float("VWISE_SESSION_CACHE_SECONDS", 5.0)
+# Flask secret key. Unset: generated once and kept in SECRET_KEY_PATH.
+SECRET_KEY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "secret_key")
+
+# Live results stream (results_stream.py)
+# Dashboard streams per worker; each holds a request thread while open.
+RESULTS_STREAM_MAX_SUBSCRIBERS = env_int("VWISE_RESULTS_STREAM_MAX", max(1, SERVER_THREADS // 2))
+# How often the producer checks for new ballots, and the shortest gap
+# between two updates (bursts in between are sent as one).
+RESULTS_STREAM_POLL_INTERVAL = env_float("VWISE_RESULTS_STREAM_POLL", 1.0)
+RESULTS_STREAM_MIN_INTERVAL = env_float("VWISE_RESULTS_STREAM_MIN_INTERVAL", 0.5)
+# Streams are closed after this long and the browser reconnects.
+RESULTS_STREAM_MAX_SECONDS = env_float("VWISE_RESULTS_STREAM_MAX_SECONDS", 300.0)
+
+# Fingerprinted, precompressed static assets (assets.py)
+ASSET_BUILD_DIR = os.environ.get(
+    "VWISE_ASSET_BUILD_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "assets"),
+)
+
+# JSON responses (responses.py)
+# Bodies smaller than this are sent uncompressed.
+COMPRESS_MIN_SIZE = env_int("VWISE_COMPRESS_MIN_SIZE", 1024)
+# Lists with at least this many rows are streamed.
+JSON_STREAM_MIN_ITEMS = env_int("VWISE_JSON_STREAM_MIN_ITEMS", 500)
+
+# Admission control (admission.py), per worker
+# Requests per second that may start on the guarded routes, and the burst
+# allowed above that; the waiting room lets people back in at the same rate.
+ADMISSION_RATE = env_float("VWISE_ADMISSION_RATE", 50.0)
+ADMISSION_BURST = env_int("VWISE_ADMISSION_BURST", 100)
+# Per user (or per student number on login).
+ADMISSION_USER_RATE = env_float("VWISE_ADMISSION_USER_RATE", 1.0)
+ADMISSION_USER_BURST = env_int("VWISE_ADMISSION_USER_BURST", 10)
+# Logins and vote submissions running at once. One request thread is left
+# for the light routes.
+ADMISSION_MAX_CONCURRENCY = env_int("VWISE_ADMISSION_MAX_CONCURRENCY", max(1, SERVER_THREADS - 1))
+# How long a heavy request waits for a slot before it is sent to the line.
+ADMISSION_MAX_WAIT = env_float("VWISE_ADMISSION_MAX_WAIT", 2.0)
+# Longest line, in seconds of waiting; past it people are asked to come back later.
+ADMISSION_MAX_QUEUE_SECONDS = env_float("VWISE_ADMISSION_MAX_QUEUE_SECONDS", 600.0)
+
+# Storage backend (storage.py): "mysql" (DB_CONFIG above) or "sqlite", one
+# local file for a single-node polling station or a test run.
+DB_BACKEND = os.environ.get("VWISE_DB_BACKEND", "mysql").strip().lower()
+SQLITE_DB_PATH = os.environ.get(
+    "VWISE_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vwise_vote.sqlite3"),
+)
+# FULL survives power loss without losing a committed ballot; NORMAL is faster.
+SQLITE_SYNCHRONOUS = os.environ.get("VWISE_SQLITE_SYNCHRONOUS", "FULL").strip().upper()
+
+# Read replicas (replicas.py): "host:port,host:port", same user, password
+# and database as DB_CONFIG. Empty: every query goes to the primary.
+DB_REPLICAS = os.environ.get("VWISE_DB_REPLICAS", "")
+# Replicas further behind than this are skipped until they catch up.
+DB_REPLICA_MAX_LAG = env_float("VWISE_DB_REPLICA_MAX_LAG", 2.0)
+DB_REPLICA_CHECK_INTERVAL = env_float("VWISE_DB_REPLICA_CHECK_INTERVAL", 5.0)
+# After a user's own write, their reads use the primary for this long.
+DB_READ_YOUR_WRITES_SECONDS = env_float("VWISE_DB_READ_YOUR_WRITES_SECONDS", 10.0)
+
+# Election window (election.py). Each worker checks the settings' version
+# this often, so a change made on one worker reaches the others within it.
+ELECTION_REFRESH_INTERVAL = env_float("VWISE_ELECTION_REFRESH_INTERVAL", 1.0)
+
+# Receipt log (receipt_log.py): how often each worker appends committed
+# ballots to the Merkle tree, and at most how many per transaction.
+RECEIPT_LOG_INTERVAL = env_float("VWISE_RECEIPT_LOG_INTERVAL", 1.0)
+RECEIPT_LOG_BATCH = env_int("VWISE_RECEIPT_LOG_BATCH", 1000)
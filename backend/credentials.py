@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import hmac
+import os
+
+from config import PASSWORD_HASH_ITERATIONS
+
+
+# ----------------------------
+# Credentials
+# ----------------------------
+# Passwords are stored as salted PBKDF2-SHA256 strings:
+#     pbkdf2_sha256$<iterations>$<salt>$<hash>
+# The iteration count is stored with each hash, so the cost can be raised
+# later (see benchmarks/bench_password_hash.py for picking it). Any stored
+# value that is plaintext or uses fewer iterations than the current setting
+# is rehashed the next time that user logs in successfully.
+
+ALGORITHM = "pbkdf2_sha256"
+SALT_BYTES = 16
+
+# Verified against when the student number does not exist, so a failed
+# login takes as long whether or not the account exists.
+_DUMMY_HASH = None
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + "$")
+
+
+def verify_password(password, stored):
+    if password is None or stored is None:
+        return False
+    if not is_hashed(stored):
+        # Legacy plaintext row
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        digest = hashlib.pbkdf2_hmac(
+            "sha256", password.encode("utf-8"), _unb64(salt), int(iterations)
+        )
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
+
+
+def needs_rehash(stored):
+    if not is_hashed(stored):
+        return True
+    try:
+        return int(stored.split("$")[1]) < PASSWORD_HASH_ITERATIONS
+    except (IndexError, ValueError):
+        return True
+
+
+def burn_verify(password):
+    """Spend the same time as a real verify when there is no such account."""
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password("not-a-real-password")
+    verify_password(password or "", _DUMMY_HASH)
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import deque
+
+
+# ----------------------------
+# Connection pool
+# ----------------------------
+# A bounded pool that sits behind get_db_connection(). Route handlers keep
+# calling conn.close() as before; for a pooled connection that hands the
+# connection back to the pool instead of tearing down the TCP session.
+#
+# mysql.connector ships its own pooling module, but it raises immediately
+# when the pool is empty and keeps no statistics; on election morning we
+# need requests to queue briefly and we need to see when they do.
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class PooledConnection:
+    """Wraps a raw connection; close() returns it to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=10, timeout=5.0, ping_after=30.0, recycle=3600.0):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # LIFO so the warmest connections are reused first and the rest can
+        # age out through recycling.
+        self._idle = deque()
+        self._meta = {}
+        self._open = 0
+        self._in_use = 0
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "failed_health_checks": 0,
+            "peak_in_use": 0,
+        }
+
+    # ---- checkout / release ----
+
+    def get(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._lock:
+            while True:
+                if self._idle:
+                    raw = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    # Reserve the slot now, connect outside the lock.
+                    self._open += 1
+                    raw = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"no database connection available after {self.timeout:.1f}s "
+                        f"(pool size {self.size})"
+                    )
+                waited = True
+                self._available.wait(remaining)
+
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            if waited:
+                wait = time.monotonic() - started
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+
+        try:
+            if raw is None:
+                raw = self._create()
+            else:
+                raw = self._check_health(raw)
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._open -= 1
+                self._available.notify()
+            raise
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        healthy = True
+        try:
+            if getattr(raw, "unread_result", False):
+                raw.consume_results()
+            if getattr(raw, "in_transaction", False):
+                # Never leak a half-finished transaction into the next request.
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        meta = self._meta.get(id(raw))
+        if meta and time.monotonic() - meta["created"] > self.recycle:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy:
+                if meta:
+                    meta["last_used"] = time.monotonic()
+                self._idle.append(raw)
+            else:
+                self._open -= 1
+                self._stats["discarded"] += 1
+                self._meta.pop(id(raw), None)
+            self._available.notify()
+
+        if not healthy:
+            self._close_quietly(raw)
+
+    # ---- health ----
+
+    def _create(self):
+        raw = self._connect()
+        now = time.monotonic()
+        with self._lock:
+            self._meta[id(raw)] = {"created": now, "last_used": now}
+            self._stats["created"] += 1
+        return raw
+
+    def _check_health(self, raw):
+        meta = self._meta.get(id(raw), {})
+        now = time.monotonic()
+        too_old = now - meta.get("created", now) > self.recycle
+        idle_for = now - meta.get("last_used", now)
+
+        if not too_old and idle_for < self.ping_after:
+            return raw
+
+        if not too_old:
+            try:
+                raw.ping(reconnect=False)
+                return raw
+            except Exception:
+                with self._lock:
+                    self._stats["failed_health_checks"] += 1
+
+        # Stale or dead: replace it, keeping the slot we already hold.
+        with self._lock:
+            self._stats["discarded"] += 1
+            self._meta.pop(id(raw), None)
+        self._close_quietly(raw)
+        return self._create()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    # ---- admin ----
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "timeout_seconds": self.timeout,
+            })
+        return data
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            for raw in idle:
+                self._meta.pop(id(raw), None)
+        for raw in idle:
+            self._close_quietly(raw)
@@ -0,0 +1,230 @@
+import logging
+import threading
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Election state
+# ----------------------------
+# The voting window and status live in election_settings (one row) but
+# are read from an in-memory snapshot: checking whether voting is open
+# costs no query, so submit_vote, the ballot fetch and a page of students
+# polling /election/status never touch the database for it.
+#
+# Every change bumps the row's version. Each worker runs a thread that
+# reads just that version every refresh_interval seconds and reloads the
+# row when it moved, so a change made on one worker reaches the others
+# within refresh_interval. The worker that made the change uses it
+# immediately.
+#
+# Voting is open when the admin set the status to "active" and the clock
+# is inside the window (either end may be left empty). If the settings
+# cannot be loaded at all, voting is treated as closed.
+
+STATUSES = ("upcoming", "active", "closed")
+INPUT_FORMATS = ("%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+
+class InvalidSettings(ValueError):
+    """Bad status or dates in an election settings update."""
+
+
+class ElectionUnavailable(Exception):
+    """The election settings have never been loaded (database down)."""
+
+
+class ElectionSnapshot:
+    __slots__ = ("version", "status", "start", "end", "updated_at")
+
+    def __init__(self, version, status, start, end, updated_at):
+        self.version = version
+        self.status = status
+        self.start = start
+        self.end = end
+        self.updated_at = updated_at
+
+    def effective_status(self, now=None):
+        """upcoming / active / closed, taking the window into account."""
+        now = now or datetime.now()
+        if self.status == "closed" or (self.end is not None and now >= self.end):
+            return "closed"
+        if self.status == "active" and (self.start is None or now >= self.start):
+            return "active"
+        return "upcoming"
+
+    def voting_open(self, now=None):
+        return self.effective_status(now) == "active"
+
+    def as_dict(self, now=None):
+        now = now or datetime.now()
+        return {
+            "election_status": self.effective_status(now),
+            "configured_status": self.status,
+            "election_start_date": _iso(self.start),
+            "election_end_date": _iso(self.end),
+            "voting_open": self.voting_open(now),
+            "version": self.version,
+            "server_time": _iso(now),
+        }
+
+
+class ElectionState:
+    def __init__(self, connect, refresh_interval=1.0):
+        self._connect = connect
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._reloads = 0
+
+    # ---- reads (no query) ----
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # First use in this worker: load synchronously once
+            with self._lock:
+                if self._snapshot is None:
+                    try:
+                        self._reload()
+                    except Exception as e:
+                        log.exception("could not load election settings")
+                        raise ElectionUnavailable(str(e))
+                snapshot = self._snapshot
+        self._ensure_refresher()
+        return snapshot
+
+    def voting_open(self):
+        try:
+            return self.snapshot().voting_open()
+        except ElectionUnavailable:
+            return False
+
+    # ---- refresh ----
+
+    def _ensure_refresher(self):
+        # Started on first use, so each worker runs its own after fork
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="election-state",
+                                                    daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                current = self._snapshot
+                if current is None or self._read_version() != current.version:
+                    self._reload()
+            except Exception:
+                # Keep serving the last snapshot; try again next round
+                log.warning("could not refresh election settings", exc_info=True)
+
+    def _read_version(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM election_settings WHERE id = 1")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _reload(self):
+        conn = self._connect()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT version, status, start_at, end_at, updated_at
+                FROM election_settings WHERE id = 1
+            """)
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if row is None:
+            snapshot = ElectionSnapshot(0, "upcoming", None, None, None)
+        else:
+            snapshot = ElectionSnapshot(row["version"], row["status"], row["start_at"],
+                                        row["end_at"], row["updated_at"])
+        previous = self._snapshot
+        if previous is not None and snapshot.version < previous.version:
+            # A slower concurrent reload read the row before a change
+            return previous
+        self._snapshot = snapshot
+        self._reloads += 1
+        if previous is not None and previous.version != snapshot.version:
+            log.info("election settings changed", extra={
+                "version": snapshot.version, "status": snapshot.status})
+        return snapshot
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- writes ----
+
+    def update(self, settings, user_id=None):
+        """Validate and store new settings; returns the new snapshot."""
+        status, start, end = parse_settings(settings)
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE election_settings
+                SET status = %s, start_at = %s, end_at = %s, version = version + 1,
+                    updated_at = NOW(), updated_by = %s
+                WHERE id = 1
+            """, (status, start, end, user_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        with self._lock:
+            return self._reload()
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "reloads": self._reloads,
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+def parse_settings(settings):
+    if not isinstance(settings, dict):
+        raise InvalidSettings("Expected a JSON object.")
+    status = str(settings.get("election_status") or "").strip().lower()
+    if status not in STATUSES:
+        raise InvalidSettings(f"election_status must be one of: {', '.join(STATUSES)}")
+    start = _parse_datetime(settings.get("election_start_date"), "election_start_date")
+    end = _parse_datetime(settings.get("election_end_date"), "election_end_date")
+    if start and end and end <= start:
+        raise InvalidSettings("The election must end after it starts.")
+    return status, start, end
+
+
+def _parse_datetime(value, field):
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str):
+        raise InvalidSettings(f"{field} must be a date and time.")
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    raise InvalidSettings(f"{field} must look like 2026-03-01T08:00.")
+
+
+def _iso(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S") if value else None
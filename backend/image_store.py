@@ -0,0 +1,174 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import re
+import uuid
+
+try:
+    from PIL import Image
+except ImportError:  # check_connections.py installs it; without it every size serves the original
+    Image = None
+
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Image store
+# ----------------------------
+# Candidate photos arrive from candidacy.js as base64 data URLs. They are
+# decoded once and written to disk under their SHA-256, so the candidates
+# table only holds a short key like "3f5a...e1.png" and the same photo
+# uploaded twice is stored once.
+#
+# Because a key never changes content, the images route can be cached by
+# browsers forever (Cache-Control: immutable).
+
+IMAGE_TYPES = {
+    b'\x89PNG\r\n\x1a\n': ('png', 'PNG'),
+    b'\xff\xd8\xff': ('jpg', 'JPEG'),
+}
+
+# Longest side in pixels for each generated size; 'full' is the upload.
+IMAGE_SIZES = {
+    'thumb': 160,
+    'medium': 480,
+}
+
+_DATA_URL = re.compile(r'^data:image/[a-z+.-]+;base64,', re.IGNORECASE)
+_KEY = re.compile(r'^[0-9a-f]{64}\.(png|jpg)$')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def is_data_url(value):
+    return isinstance(value, str) and _DATA_URL.match(value) is not None
+
+
+def is_image_key(value):
+    return isinstance(value, str) and _KEY.match(value) is not None
+
+
+class ImageStore:
+    def __init__(self, root, max_bytes=5 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        if Image is None:
+            log.warning("Pillow is not installed; photo thumbnails will serve the full upload")
+
+    def save_data_url(self, data_url):
+        """Store a base64 data URL and return its key."""
+        match = _DATA_URL.match(data_url or '')
+        if not match:
+            raise InvalidImage("Photo must be a base64 image data URL.")
+        encoded = data_url[match.end():]
+        if len(encoded) * 3 // 4 > self.max_bytes:
+            raise InvalidImage("Photo is larger than 5MB.")
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise InvalidImage("Photo is not valid base64.")
+        return self.save_bytes(data)
+
+    def save_bytes(self, data):
+        if len(data) > self.max_bytes:
+            raise InvalidImage("Photo is larger than 5MB.")
+        for magic, (ext, pil_format) in IMAGE_TYPES.items():
+            if data.startswith(magic):
+                break
+        else:
+            raise InvalidImage("Photo must be a JPG or PNG image.")
+
+        digest = hashlib.sha256(data).hexdigest()
+        key = f"{digest}.{ext}"
+        path = self.path(key)
+        if not os.path.exists(path):
+            self._write(path, data)
+            self._write_resized(key, data, pil_format)
+        return key
+
+    def path(self, key, size='full'):
+        digest = key.split('.', 1)[0]
+        name = key if size == 'full' else f"{digest}_{size}.{key.rsplit('.', 1)[1]}"
+        return os.path.join(self.root, digest[:2], name)
+
+    def resolve(self, key, size='full'):
+        """Return (directory, filename) for a stored image, or None."""
+        if not is_image_key(key) or (size != 'full' and size not in IMAGE_SIZES):
+            return None
+        path = self.path(key, size)
+        if not os.path.exists(path):
+            # Stored without Pillow: serve the original for every size.
+            path = self.path(key)
+            if not os.path.exists(path):
+                return None
+        return os.path.split(path)
+
+    def _write_resized(self, key, data, pil_format):
+        if Image is None:
+            return
+        try:
+            with Image.open(io.BytesIO(data)) as original:
+                for size, longest in IMAGE_SIZES.items():
+                    image = original.copy()
+                    image.thumbnail((longest, longest))
+                    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                        image = image.convert('RGB')
+                    out = io.BytesIO()
+                    image.save(out, pil_format, optimize=True)
+                    self._write(self.path(key, size), out.getvalue())
+        except Exception as e:
+            # The original is stored; sizes fall back to it.
+            log.warning("could not resize image", extra={"key": key, "error": str(e)})
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def image_url(photo, size='medium'):
+    """URL for a candidates.photo value: stored key, legacy value or None."""
+    if not photo:
+        return None
+    if is_image_key(photo):
+        return f"/images/{size}/{photo}"
+    if is_data_url(photo):
+        return None  # not migrated yet; never ship the blob in a list
+    return photo
+
+
+def migrate_inline_photos(conn, store, batch_size=50):
+    """Move base64 photos still stored in candidates.photo into the store."""
+    moved = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id, photo FROM candidates
+                WHERE photo LIKE 'data:%%'
+                LIMIT %s
+            """, (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for candidate_id, photo in rows:
+                try:
+                    key = store.save_data_url(photo)
+                except InvalidImage as e:
+                    log.warning("dropping unreadable photo", extra={"candidate_id": candidate_id, "error": str(e)})
+                    key = ''
+                cursor.execute("UPDATE candidates SET photo = %s WHERE id = %s", (key, candidate_id))
+                moved += 1
+            conn.commit()
+    finally:
+        cursor.close()
+    return moved
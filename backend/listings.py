@@ -0,0 +1,221 @@
+import base64
+from datetime import datetime
+
+from positions import POSITION_NAMES, position_number
+from tally import TTLCache
+
+
+# ----------------------------
+# Admin listings
+# ----------------------------
+# The approval pages list candidates and partylists newest first, a page
+# at a time. Pages use keyset pagination on (created_at, id): the cursor
+# is the last row of the previous page, so fetching page 50 costs the
+# same index range scan as page 1 (no OFFSET).
+#
+# Filters and the column list come from the query string and are checked
+# against a whitelist before they reach SQL. Totals are a separate
+# endpoint because COUNT(*) is the expensive part; they are cached
+# briefly and cleared when a row changes.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+COUNT_CACHE_SECONDS = 10.0
+
+
+class InvalidQuery(ValueError):
+    """Bad cursor, filter, limit or field name."""
+
+
+class Listing:
+    def __init__(self, table, columns, filters, computed=None):
+        self.table = table
+        # name -> SQL expression, in output order
+        self.columns = columns
+        # name -> (SQL column, parse(value))
+        self.filters = filters
+        # name -> (required columns, fill(row))
+        self.computed = computed or {}
+
+
+def _parse_flag(value):
+    if value in ("1", "true", "approved"):
+        return 1
+    if value in ("0", "false", "pending"):
+        return 0
+    raise InvalidQuery("approved must be 0 or 1")
+
+
+def _parse_position(value):
+    number = position_number(value)
+    if number not in POSITION_NAMES:
+        raise InvalidQuery(f"Unknown position: {value}")
+    return number
+
+
+def _parse_text(value):
+    return value.strip()
+
+
+def encode_cursor(row):
+    text = f"{row['created_at'].strftime('%Y-%m-%d %H:%M:%S')}|{row['id']}"
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = text.split("|")
+        return datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S"), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidQuery("Invalid cursor")
+
+
+def _where(listing, args):
+    clauses, params = [], []
+    for name, (column, parse) in listing.filters.items():
+        value = args.get(name)
+        if value is None or value == "" or value == "all":
+            continue
+        clauses.append(f"{column} = %s")
+        params.append(parse(value))
+    return clauses, params
+
+
+def _select_columns(listing, fields):
+    if not fields:
+        names = list(listing.columns)
+        extras = list(listing.computed)
+    else:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in listing.columns and f not in listing.computed]
+        if unknown:
+            raise InvalidQuery(f"Unknown field(s): {', '.join(unknown)}")
+        extras = [f for f in wanted if f in listing.computed]
+        names = [f for f in wanted if f in listing.columns]
+        for extra in extras:
+            names += [c for c in listing.computed[extra][0] if c not in names]
+    # The cursor needs these
+    for required in ("id", "created_at"):
+        if required not in names:
+            names.append(required)
+    return names, extras
+
+
+def list_page(conn, listing, args):
+    """One page, newest first: {"items": [...], "next_cursor": str|None}."""
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise InvalidQuery("limit must be a number")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    names, extras = _select_columns(listing, args.get("fields"))
+    clauses, params = _where(listing, args)
+    if args.get("cursor"):
+        created_at, row_id = decode_cursor(args["cursor"])
+        clauses.append("(created_at < %s OR (created_at = %s AND id < %s))")
+        params += [created_at, created_at, row_id]
+
+    select = ", ".join(f"{listing.columns[name]} AS {name}" for name in names)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # One extra row tells us whether there is a next page
+        cursor.execute(f"""
+            SELECT {select}
+            FROM {listing.table}
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more else None
+    for row in rows:
+        for extra in extras:
+            listing.computed[extra][1](row)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+listing_counts = TTLCache()
+
+
+def count_rows(connect, listing, args):
+    clauses, params = _where(listing, args)
+    key = (listing.table, tuple(params), tuple(clauses))
+
+    def load():
+        conn = connect()
+        cursor = conn.cursor()
+        try:
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            cursor.execute(f"SELECT COUNT(*) FROM {listing.table} {where}", params)
+            return int(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+            conn.close()
+
+    return listing_counts.get_or_load(key, COUNT_CACHE_SECONDS, load)
+
+
+# ---- the two admin listings ----
+
+def _full_name(row):
+    row["full_name"] = f"{row['first_name']} {row['last_name']}"
+
+
+def _party(row):
+    row["party"] = row["affiliation_type"].title() if row["affiliation_type"] else "Independent"
+
+
+CANDIDATE_LISTING = Listing(
+    "candidates",
+    columns={
+        "id": "id",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "student_id": "student_id",
+        "email": "email",
+        "college": "college",
+        "year_level": "year_level",
+        "position": "position",
+        "affiliation_type": "affiliation_type",
+        "platform": "platform",
+        # Inline base64 photos left by old versions are not sent in lists
+        "photo": "CASE WHEN photo LIKE 'data:%%' THEN NULL ELSE photo END",
+        "approved": "approved",
+        "created_at": "created_at",
+    },
+    filters={
+        "approved": ("approved", _parse_flag),
+        "position": ("position", _parse_position),
+        "college": ("college", _parse_text),
+    },
+    computed={
+        "full_name": (["first_name", "last_name"], _full_name),
+        "party": (["affiliation_type"], _party),
+    },
+)
+
+PARTYLIST_LISTING = Listing(
+    "partylists",
+    columns={
+        "id": "id",
+        "partylist_name": "partylist_name",
+        "platform": "platform",
+        "president_name": "president_name",
+        "president_student_id": "president_student_id",
+        "contact_email": "contact_email",
+        "contact_number": "contact_number",
+        "approved": "approved",
+        "created_at": "created_at",
+    },
+    filters={
+        "approved": ("approved", _parse_flag),
+    },
+)
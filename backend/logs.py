@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+
+
+# ----------------------------
+# Logging
+# ----------------------------
+# Modules log through the standard logging module
+# (logging.getLogger(__name__)) and pass structured fields with extra=:
+#
+#     log.info("vote submitted", extra={"user_id": user_id, "sample": True})
+#
+# configure_logging() puts a QueueHandler on the root logger, so a request
+# thread only appends the record to an in-memory queue; a listener thread
+# formats it (one JSON object per line by default) and writes it out. When
+# the queue is full records are dropped and counted rather than blocking
+# the request.
+#
+# Before a record is queued:
+#   * fields named like secrets (password, token, ...) are replaced, and
+#     data: URLs or very long strings are reduced to their length;
+#   * INFO and DEBUG records marked sample=True, used on hot routes, are
+#     kept with probability LOG_SAMPLE_RATE. Warnings and errors are always
+#     kept.
+
+SECRET_FIELDS = re.compile(r"pass(word)?|secret|token|authorization|cookie|photo", re.IGNORECASE)
+MAX_FIELD_LENGTH = 256
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def redact(key, value):
+    if key is not None and SECRET_FIELDS.search(str(key)):
+        return "[redacted]"
+    if isinstance(value, dict):
+        return {k: redact(k, v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(None, v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str):
+        if value.startswith("data:"):
+            return f"<data url, {len(value)} chars>"
+        if len(value) > MAX_FIELD_LENGTH:
+            return value[:MAX_FIELD_LENGTH] + f"... <{len(value)} chars>"
+    return value
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and key != "sample"}
+
+
+class RedactFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in record_fields(record).items():
+            setattr(record, key, redact(key, value))
+        if isinstance(record.args, dict):
+            record.args = redact(None, record.args)
+        elif record.args:
+            record.args = tuple(redact(None, arg) for arg in record.args)
+        return True
+
+
+class SampleFilter(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: drops the record when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level="INFO", fmt="json", sample_rate=0.01, queue_size=10000):
+    """Install the queue handler on the root logger, once per process."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue = queue.Queue(queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    # Filters run on the request thread, before the record is queued, so
+    # dropped samples cost nothing further and secrets never reach the queue.
+    handler.addFilter(SampleFilter(sample_rate))
+    handler.addFilter(RedactFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.handler = handler
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records; the listener thread does not survive fork."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    return _listener.handler.dropped if _listener is not None else 0
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+
+# ----------------------------
+# Request metrics
+# ----------------------------
+# Flask before/after hooks time every request, and get_db_connection()
+# hands out connections whose cursors time every query, so each request
+# knows how many queries it ran and how long it spent in MySQL. Both are
+# kept as per-route histograms together with the time spent checking a
+# connection out of the pool, and served by /metrics in the Prometheus
+# text format.
+#
+# Metrics are per process. Under serve.py every worker keeps its own and
+# labels them with its pid; scrape each worker, or sum by route.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0)
+
+# Queries run outside a request (vote queue flusher, photo migration)
+BACKGROUND = "background"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pid = str(os.getpid())
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._counters = {}     # (name, labels) -> value
+
+    # ---- recording ----
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_db(self, seconds, query):
+        """Called by InstrumentedCursor for every execute and fetch."""
+        if has_request_context():
+            g.db_seconds = g.get("db_seconds", 0.0) + seconds
+            if query:
+                g.db_queries = g.get("db_queries", 0) + 1
+        else:
+            labels = (("route", BACKGROUND),)
+            self.inc("vwise_db_seconds_total", labels, seconds)
+            if query:
+                self.inc("vwise_db_queries_total", labels)
+
+    def record_pool_wait(self, seconds):
+        self.observe("vwise_db_pool_checkout_seconds", (), seconds, POOL_WAIT_BUCKETS)
+
+    # ---- flask hooks ----
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    def _after_request(self, response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        # The rule, not the path, so /approve-candidate/<id> is one series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        labels = (("route", route), ("method", request.method))
+
+        self.observe("vwise_request_seconds", labels, elapsed, LATENCY_BUCKETS)
+        self.observe("vwise_request_db_seconds", labels, g.db_seconds, DB_TIME_BUCKETS)
+        self.observe("vwise_request_db_queries", labels, g.db_queries, QUERY_COUNT_BUCKETS)
+        self.inc("vwise_responses_total", labels + (("status", str(response.status_code)),))
+        return response
+
+    # ---- exposition ----
+
+    def render(self, gauges=()):
+        """Prometheus text format. gauges: (name, help, value) extras."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(labels, le=_number(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{self._labels(labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{self._labels(labels)} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{self._labels(labels)} {_number(value)}")
+
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{self._labels(())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _labels(self, labels, le=None):
+        pairs = list(labels) + [("pid", self.pid)]
+        if le is not None:
+            pairs.append(("le", le))
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ----------------------------
+# Instrumented DB handles
+# ----------------------------
+
+class InstrumentedCursor:
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def _timed(self, method, query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._metrics.record_db(time.perf_counter() - started, query)
+
+    def execute(self, *args, **kwargs):
+        return self._timed(self._cursor.execute, True, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._timed(self._cursor.executemany, True, *args, **kwargs)
+
+    # Unbuffered cursors read rows off the wire while fetching
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone, False)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed(self._cursor.fetchmany, False, *args, **kwargs)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall, False)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Wraps a pooled connection so its cursors are timed."""
+
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._metrics)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            self._metrics.record_db(time.perf_counter() - started, False)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.close()
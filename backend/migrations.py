@@ -0,0 +1,389 @@
+import logging
+
+from positions import POSITION_NAMES
+from receipt_log import ballot_hash
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Schema migrations
+# ----------------------------
+# Versioned, forward-only migrations for the vwise_vote database, applied
+# by check_connections.py before the app starts. schema_migrations records
+# which versions have run.
+#
+# MySQL commits DDL implicitly, so a migration cannot be rolled back
+# halfway. Every step is written to be safe to run again: tables are
+# created IF NOT EXISTS and indexes/columns are checked in
+# information_schema first. Databases that were created by hand before
+# this module existed are brought up to the same shape.
+#
+# The same migrations build the SQLite schema (storage.py translates the
+# DDL); the helpers below read sqlite_master instead of information_schema.
+
+
+# ---- helpers ----
+
+def is_sqlite(cursor):
+    return getattr(cursor, "dialect", None) == "sqlite"
+
+
+def table_exists(cursor, table):
+    if is_sqlite(cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone() is not None
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone() is not None
+
+
+def column_type(cursor, table, column):
+    if is_sqlite(cursor):
+        cursor.execute(f"PRAGMA table_info({table})")
+        for row in cursor.fetchall():
+            if row[1] == column:
+                return row[2].split("(")[0].split()[0].lower() if row[2] else None
+        return None
+    cursor.execute("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    value = row[0]
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    return value.lower()
+
+
+def index_exists(cursor, table, index):
+    if is_sqlite(cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = %s", (index,))
+        return cursor.fetchone() is not None
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def add_index(cursor, table, index, columns, unique=False):
+    if index_exists(cursor, table, index):
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cursor.execute(f"CREATE {kind} {index} ON {table} ({columns})")
+
+
+def drop_index(cursor, table, index):
+    if index_exists(cursor, table, index):
+        cursor.execute(f"DROP INDEX {index} ON {table}")
+
+
+def has_duplicates(cursor, table, columns):
+    cursor.execute(f"""
+        SELECT 1 FROM {table}
+        GROUP BY {columns}
+        HAVING COUNT(*) > 1
+        LIMIT 1
+    """)
+    return cursor.fetchone() is not None
+
+
+def add_unique_or_warn(cursor, table, index, columns, fallback_index):
+    """Add a unique index; if existing rows violate it, index without it."""
+    if index_exists(cursor, table, index):
+        return
+    if has_duplicates(cursor, table, columns):
+        log.warning("%s has duplicate (%s) rows; added a plain index instead of %s. "
+                    "Remove the duplicates and run the checks again.", table, columns, index)
+        add_index(cursor, table, fallback_index, columns)
+        return
+    add_index(cursor, table, index, columns, unique=True)
+    drop_index(cursor, table, fallback_index)
+
+
+# ---- migrations ----
+
+def m001_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            firstname VARCHAR(100) NOT NULL,
+            middlename VARCHAR(100) NULL,
+            lastname VARCHAR(100) NOT NULL,
+            email VARCHAR(255) NULL,
+            studentNumber VARCHAR(32) NOT NULL,
+            yearlevel TINYINT UNSIGNED NULL,
+            department VARCHAR(64) NULL,
+            password VARCHAR(255) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            student_id VARCHAR(32) NULL,
+            email VARCHAR(255) NULL,
+            college VARCHAR(16) NULL,
+            year_level VARCHAR(16) NULL,
+            position TINYINT UNSIGNED NOT NULL,
+            affiliation_type VARCHAR(16) NULL,
+            platform TEXT NULL,
+            photo MEDIUMTEXT NULL,
+            approved TINYINT(1) NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS partylists (
+            id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            partylist_name VARCHAR(255) NOT NULL,
+            platform TEXT NULL,
+            president_name VARCHAR(200) NULL,
+            president_student_id VARCHAR(32) NULL,
+            contact_email VARCHAR(255) NULL,
+            contact_number VARCHAR(32) NULL,
+            approved TINYINT(1) NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS votes (
+            id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            candidate_id INT NOT NULL,
+            position TINYINT UNSIGNED NOT NULL,
+            voted_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def m002_integer_positions(cursor):
+    # Older code stored the display name in votes.position; map it back to
+    # the number before changing the column type.
+    if column_type(cursor, "votes", "position") in ("varchar", "char", "text"):
+        for number, name in POSITION_NAMES.items():
+            cursor.execute("UPDATE votes SET position = %s WHERE position = %s", (str(number), name))
+        cursor.execute("ALTER TABLE votes MODIFY position TINYINT UNSIGNED NOT NULL")
+    if column_type(cursor, "candidates", "position") != "tinyint":
+        cursor.execute("ALTER TABLE candidates MODIFY position TINYINT UNSIGNED NOT NULL")
+
+
+def m003_credentials(cursor):
+    # SQLite does not enforce VARCHAR lengths
+    if not is_sqlite(cursor):
+        cursor.execute("""
+            SELECT CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'accounts' AND COLUMN_NAME = 'password'
+        """)
+        row = cursor.fetchone()
+        if row and row[0] is not None and row[0] < 255:
+            cursor.execute("ALTER TABLE accounts MODIFY password VARCHAR(255) NOT NULL")
+    # login looks accounts up by studentNumber
+    add_unique_or_warn(cursor, "accounts", "uq_accounts_student_number", "studentNumber",
+                       "idx_accounts_student_number")
+
+
+def m004_hot_path_indexes(cursor):
+    # get_candidates / get_candidates_simple: WHERE approved = 1 ORDER BY position, last_name
+    add_index(cursor, "candidates", "idx_candidates_approved_position", "approved, position, last_name")
+    # admin listings: ORDER BY created_at DESC, id (keyset pagination)
+    add_index(cursor, "candidates", "idx_candidates_created", "created_at, id")
+    add_index(cursor, "partylists", "idx_partylists_created", "created_at, id")
+    # get_partylists: WHERE approved = 1 ORDER BY partylist_name
+    add_index(cursor, "partylists", "idx_partylists_approved_name", "approved, partylist_name")
+    add_unique_or_warn(cursor, "partylists", "uq_partylists_name", "partylist_name",
+                       "idx_partylists_name")
+    # submit_vote / write-behind replay look votes up by user; one vote per position
+    add_unique_or_warn(cursor, "votes", "uq_votes_user_position", "user_id, position",
+                       "idx_votes_user")
+    add_index(cursor, "votes", "idx_votes_candidate", "candidate_id")
+
+
+def m005_voter_status(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS voter_status (
+            user_id INT NOT NULL PRIMARY KEY,
+            receipt CHAR(32) NOT NULL,
+            voted_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    # Voters who voted before voter_status existed must stay locked out.
+    cursor.execute("""
+        INSERT IGNORE INTO voter_status (user_id, receipt, voted_at)
+        SELECT user_id, REPLACE(UUID(), '-', ''), MIN(voted_at)
+        FROM votes
+        GROUP BY user_id
+    """)
+
+
+def m006_tally_counters(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vote_tallies (
+            candidate_id INT NOT NULL,
+            shard TINYINT UNSIGNED NOT NULL,
+            position TINYINT UNSIGNED NOT NULL,
+            votes INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (candidate_id, shard)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tally_totals (
+            name VARCHAR(32) NOT NULL,
+            shard TINYINT UNSIGNED NOT NULL,
+            value BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, shard)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    # Seed the counters from any votes already cast.
+    cursor.execute("SELECT 1 FROM tally_totals LIMIT 1")
+    if cursor.fetchone() is None:
+        cursor.execute("""
+            INSERT INTO vote_tallies (candidate_id, shard, position, votes)
+            SELECT candidate_id, 0, MIN(position), COUNT(*)
+            FROM votes
+            GROUP BY candidate_id
+        """)
+        cursor.execute("""
+            INSERT INTO tally_totals (name, shard, value)
+            SELECT 'ballots', 0, COUNT(*) FROM voter_status
+        """)
+
+
+def m007_listing_indexes(cursor):
+    # Approval pages filtered by approved state, newest first (listings.py)
+    add_index(cursor, "candidates", "idx_candidates_approved_created", "approved, created_at, id")
+    add_index(cursor, "partylists", "idx_partylists_approved_created", "approved, created_at, id")
+
+
+def m008_election_settings(cursor):
+    # One row (id = 1); version goes up on every change (election.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS election_settings (
+            id INT NOT NULL PRIMARY KEY,
+            status VARCHAR(16) NOT NULL DEFAULT 'upcoming',
+            start_at DATETIME NULL,
+            end_at DATETIME NULL,
+            version INT NOT NULL DEFAULT 0,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_by INT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("INSERT IGNORE INTO election_settings (id) VALUES (1)")
+
+
+def m009_receipt_log(cursor):
+    # Merkle tree over committed ballots (receipt_log.py)
+    if column_type(cursor, "voter_status", "ballot_hash") is None:
+        cursor.execute("ALTER TABLE voter_status ADD COLUMN ballot_hash CHAR(64) NULL")
+    if column_type(cursor, "voter_status", "log_index") is None:
+        cursor.execute("ALTER TABLE voter_status ADD COLUMN log_index BIGINT NULL")
+    # Proof lookups by receipt; the sequencer's scan for unappended ballots
+    add_unique_or_warn(cursor, "voter_status", "uq_voter_status_receipt", "receipt",
+                       "idx_voter_status_receipt")
+    add_index(cursor, "voter_status", "idx_voter_status_log_index", "log_index, voted_at")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receipt_log_nodes (
+            level TINYINT UNSIGNED NOT NULL,
+            idx BIGINT NOT NULL,
+            hash CHAR(64) NOT NULL,
+            PRIMARY KEY (level, idx)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receipt_log_head (
+            id INT NOT NULL PRIMARY KEY,
+            tree_size BIGINT NOT NULL DEFAULT 0,
+            root CHAR(64) NULL,
+            updated_at DATETIME NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("INSERT IGNORE INTO receipt_log_head (id) VALUES (1)")
+
+    # Hash the ballots cast before this migration so they join the log too
+    cursor.execute("SELECT user_id, receipt FROM voter_status WHERE ballot_hash IS NULL")
+    receipts = dict(cursor.fetchall())
+    if receipts:
+        cursor.execute("SELECT user_id, candidate_id, position FROM votes")
+        rows = {}
+        for user_id, candidate_id, position in cursor.fetchall():
+            if user_id in receipts:
+                rows.setdefault(user_id, []).append((candidate_id, position))
+        if rows:
+            cursor.executemany(
+                "UPDATE voter_status SET ballot_hash = %s WHERE user_id = %s",
+                [(ballot_hash(receipts[user_id], user_rows), user_id)
+                 for user_id, user_rows in rows.items()],
+            )
+
+
+MIGRATIONS = [
+    (1, "base tables", m001_base_tables),
+    (2, "integer positions", m002_integer_positions),
+    (3, "credential columns", m003_credentials),
+    (4, "hot path indexes", m004_hot_path_indexes),
+    (5, "voter status", m005_voter_status),
+    (6, "tally counters", m006_tally_counters),
+    (7, "listing indexes", m007_listing_indexes),
+    (8, "election settings", m008_election_settings),
+    (9, "receipt log", m009_receipt_log),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ---- runner ----
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def current_version(conn):
+    cursor = conn.cursor()
+    try:
+        if not table_exists(cursor, "schema_migrations"):
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def apply_migrations(conn, report=print):
+    """Apply every pending migration in order. Returns the versions applied."""
+    cursor = conn.cursor()
+    applied = []
+    try:
+        ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            report(f"Applying migration {version:03d}: {name}")
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+            conn.commit()
+            applied.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return applied
@@ -0,0 +1,109 @@
+# ----------------------------
+# Bulk moderation
+# ----------------------------
+# Approve, revoke or delete many candidates/partylists in one request.
+# All ids are handled in one transaction: the rows are locked (in id
+# order, so two admins moderating overlapping sets cannot deadlock), the
+# ones that need changing are updated with IN (...) lists of at most
+# IN_CHUNK ids, and the commit happens once. The caller gets an outcome
+# for every id and invalidates its caches once.
+
+IN_CHUNK = 500
+MAX_IDS = 5000
+
+TABLES = ("candidates", "partylists")
+
+# action -> (new approved value or None for delete, outcome when changed)
+ACTIONS = {
+    "approve": (1, "approved"),
+    "reject": (0, "rejected"),
+    "delete": (None, "deleted"),
+}
+
+
+class InvalidBatch(ValueError):
+    """The request body is not a usable batch."""
+
+
+def parse_batch(payload):
+    """Return (action, ids) from {"action": ..., "ids": [...]}."""
+    if not isinstance(payload, dict):
+        raise InvalidBatch("Expected a JSON object with action and ids.")
+    action = payload.get("action")
+    if action not in ACTIONS:
+        raise InvalidBatch(f"action must be one of: {', '.join(ACTIONS)}")
+    raw_ids = payload.get("ids")
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise InvalidBatch("ids must be a non-empty list.")
+    if len(raw_ids) > MAX_IDS:
+        raise InvalidBatch(f"At most {MAX_IDS} ids per request.")
+
+    ids, seen = [], set()
+    for value in raw_ids:
+        try:
+            row_id = int(value)
+        except (ValueError, TypeError):
+            raise InvalidBatch(f"Invalid id: {value!r}")
+        if row_id not in seen:
+            seen.add(row_id)
+            ids.append(row_id)
+    return action, ids
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def moderate(conn, table, action, ids, chunk_size=IN_CHUNK):
+    """Apply action to ids in one transaction; returns {id: outcome}.
+
+    Outcomes: approved / rejected / deleted, "unchanged" when the row was
+    already in that state, "not_found" when there is no such row.
+    """
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table}")
+    approved, changed_outcome = ACTIONS[action]
+
+    cursor = conn.cursor()
+    try:
+        current = {}
+        for chunk in _chunks(sorted(ids), chunk_size):
+            marks = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"SELECT id, approved FROM {table} WHERE id IN ({marks}) ORDER BY id FOR UPDATE",
+                chunk,
+            )
+            current.update((row_id, state) for row_id, state in cursor.fetchall())
+
+        if approved is None:
+            to_change = sorted(current)
+        else:
+            to_change = sorted(i for i, state in current.items() if state != approved)
+
+        for chunk in _chunks(to_change, chunk_size):
+            marks = ", ".join(["%s"] * len(chunk))
+            if approved is None:
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({marks})", chunk)
+            else:
+                cursor.execute(
+                    f"UPDATE {table} SET approved = %s WHERE id IN ({marks})",
+                    [approved] + chunk,
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    changed = set(to_change)
+    outcomes = {}
+    for row_id in ids:
+        if row_id not in current:
+            outcomes[row_id] = "not_found"
+        elif row_id in changed:
+            outcomes[row_id] = changed_outcome
+        else:
+            outcomes[row_id] = "unchanged"
+    return outcomes
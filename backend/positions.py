@@ -0,0 +1,43 @@
+# ----------------------------
+# Ballot positions
+# ----------------------------
+# candidates.position holds the number; the ballot and the voting page use
+# the display name.
+
+POSITION_NAMES = {
+    1: 'President',
+    2: 'Vice President',
+    3: 'Secretary',
+    4: 'Assistant Secretary',
+    5: 'Treasurer',
+    6: 'Auditor',
+    7: 'PIO (Public Information Officer)',
+    8: 'COE Representative',
+    9: 'CBAA Representative',
+    10: 'CTE Representative',
+    11: 'CCS Representative',
+    12: 'CCJE Representative',
+    13: 'CIT Representative',
+    14: 'CAS Representative',
+    15: 'CHMT Representative',
+}
+
+POSITION_NUMBERS = {name: number for number, name in POSITION_NAMES.items()}
+
+# Sort key for positions that are missing or not in the table above.
+UNKNOWN_POSITION = 999
+
+
+def position_number(value):
+    """Return the integer position for a number, numeric string or name."""
+    if value in POSITION_NUMBERS:
+        return POSITION_NUMBERS[value]
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return UNKNOWN_POSITION
+
+
+def position_name(value):
+    number = position_number(value)
+    return POSITION_NAMES.get(number, str(value))
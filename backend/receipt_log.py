@@ -0,0 +1,326 @@
+import hashlib
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Receipt log
+# ----------------------------
+# Every committed ballot is appended to a Merkle tree built as in RFC 6962
+# (Certificate Transparency), so a voter can check that their ballot is in
+# the log without anyone scanning the votes table:
+#
+#   ballot_hash = SHA-256("vwise-ballot:v1:" receipt ":" choices)
+#   leaf        = SHA-256(0x00 || ballot_hash)
+#   node        = SHA-256(0x01 || left || right)
+#
+# The receipt is the random id the voter got from /submit-vote. Without it
+# a ballot_hash says nothing about the choices behind it.
+#
+# receipt_log_nodes keeps the hash of every complete subtree, keyed by
+# (level, idx): the node at level L, index i covers leaves
+# [i * 2^L, (i + 1) * 2^L). Those hashes never change once written, so the
+# root of the tree at any past size and an inclusion proof against it are
+# built from O(log n) stored nodes, fetched in one query. An append writes
+# the leaf plus the subtrees it completes (two nodes on average) and only
+# reads the right edge of the tree.
+#
+# Ballots are not appended in their own transaction: that would make every
+# vote wait on the log's single head row. write_ballot and the write-behind
+# flush store ballot_hash in voter_status; a sequencer thread in each worker
+# then appends whatever is not in the log yet, in batches under the head row
+# lock, usually within a second. Until then a proof request says "pending".
+
+BALLOT_PREFIX = "vwise-ballot:v1:"
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+class ReceiptNotFound(LookupError):
+    pass
+
+
+class InvalidTreeSize(ValueError):
+    pass
+
+
+def ballot_hash(receipt, rows):
+    """rows: [(candidate_id, position)] as stored in votes."""
+    choices = ",".join(f"{position}={candidate_id}" for candidate_id, position in sorted(
+        rows, key=lambda row: row[1]))
+    return hashlib.sha256(f"{BALLOT_PREFIX}{receipt}:{choices}".encode("utf-8")).hexdigest()
+
+
+def leaf_hash(ballot_hex):
+    return hashlib.sha256(b"\x00" + bytes.fromhex(ballot_hex)).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+# ---- tree shape ----
+
+def _split(n):
+    """Largest power of two smaller than n (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _perfect_nodes(start, end):
+    """The complete subtrees covering [start, end), left to right, as (level, idx).
+
+    start is aligned the way RFC 6962 ranges are, so the greedy split
+    matches the spec's tree.
+    """
+    nodes = []
+    while start < end:
+        level = (end - start).bit_length() - 1
+        nodes.append((level, start >> level))
+        start += 1 << level
+    return nodes
+
+
+def _proof_ranges(index, start, end):
+    """Sibling ranges on the path from leaf index to the root of [start, end), leaf first."""
+    ranges = []
+    while end - start > 1:
+        k = _split(end - start)
+        if index < start + k:
+            ranges.append((start + k, end))
+            end = start + k
+        else:
+            ranges.append((start, start + k))
+            start += k
+    ranges.reverse()
+    return ranges
+
+
+def _fold(hashes):
+    """Hash of a range from its complete subtrees (left to right)."""
+    result = hashes[-1]
+    for left in reversed(hashes[:-1]):
+        result = node_hash(left, result)
+    return result
+
+
+def root_from_frontier(frontier):
+    """Root from {level: hash} of the complete subtrees on the right edge."""
+    if not frontier:
+        return bytes.fromhex(EMPTY_ROOT)
+    return _fold([frontier[level] for level in sorted(frontier, reverse=True)])
+
+
+def verify_inclusion(ballot_hex, index, tree_size, audit_path, root_hex):
+    """Check an inclusion proof (RFC 6962 / RFC 9162 section 2.1.3.2)."""
+    if not 0 <= index < tree_size:
+        return False
+    fn, sn = index, tree_size - 1
+    result = leaf_hash(ballot_hex)
+    for sibling_hex in audit_path:
+        if sn == 0:
+            return False
+        sibling = bytes.fromhex(sibling_hex)
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            if not fn & 1:
+                while fn and not fn & 1:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result.hex() == root_hex
+
+
+# ---- storage ----
+
+def _load_nodes(cursor, keys):
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    where = " OR ".join(["(level = %s AND idx = %s)"] * len(keys))
+    params = [value for key in keys for value in key]
+    cursor.execute(f"SELECT level, idx, hash FROM receipt_log_nodes WHERE {where}", params)
+    nodes = {(row[0], row[1]): bytes.fromhex(row[2]) for row in cursor.fetchall()}
+    missing = [key for key in keys if key not in nodes]
+    if missing:
+        raise RuntimeError(f"receipt log is missing nodes {missing[:5]}")
+    return nodes
+
+
+def _frontier_keys(size):
+    return [(level, (size >> level) - 1) for level in range(size.bit_length()) if size >> level & 1]
+
+
+def append_pending(conn, limit=1000):
+    """Append up to limit ballots that are not in the log yet; returns how many."""
+    cursor = conn.cursor()
+    try:
+        # Serializes appenders across workers; held only for one batch
+        cursor.execute("SELECT tree_size FROM receipt_log_head WHERE id = 1 FOR UPDATE")
+        size = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT user_id, ballot_hash FROM voter_status
+            WHERE log_index IS NULL AND ballot_hash IS NOT NULL
+            ORDER BY voted_at, user_id
+            LIMIT %s
+        """, (limit,))
+        pending = cursor.fetchall()
+        if not pending:
+            conn.rollback()
+            return 0
+
+        stored = _load_nodes(cursor, _frontier_keys(size))
+        frontier = {level: stored[(level, idx)] for level, idx in _frontier_keys(size)}
+        new_nodes, positions = [], []
+        for user_id, ballot_hex in pending:
+            idx, level = size, 0
+            node = leaf_hash(ballot_hex)
+            new_nodes.append((0, idx, node.hex()))
+            # A right child completes its parent's subtree
+            while idx & 1:
+                node = node_hash(frontier.pop(level), node)
+                idx >>= 1
+                level += 1
+                new_nodes.append((level, idx, node.hex()))
+            frontier[level] = node
+            positions.append((size, user_id))
+            size += 1
+
+        cursor.executemany(
+            "INSERT INTO receipt_log_nodes (level, idx, hash) VALUES (%s, %s, %s)", new_nodes)
+        cursor.executemany(
+            "UPDATE voter_status SET log_index = %s WHERE user_id = %s", positions)
+        cursor.execute("""
+            UPDATE receipt_log_head SET tree_size = %s, root = %s, updated_at = NOW() WHERE id = 1
+        """, (size, root_from_frontier(frontier).hex()))
+        conn.commit()
+        return len(pending)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def get_root(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT tree_size, root, updated_at FROM receipt_log_head WHERE id = 1")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None or not row[0]:
+        return {"tree_size": 0, "root": EMPTY_ROOT, "updated_at": None}
+    return {"tree_size": row[0], "root": row[1], "updated_at": row[2]}
+
+
+def inclusion_proof(conn, receipt, tree_size=None):
+    """The proof for a receipt, or {"status": "pending"} before it is appended.
+
+    tree_size picks an earlier root to prove against (default: the current
+    one). Raises ReceiptNotFound or InvalidTreeSize.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT ballot_hash, log_index FROM voter_status WHERE receipt = %s", (receipt,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ReceiptNotFound("No ballot has this receipt.")
+        ballot_hex, index = row
+        if ballot_hex is None or index is None:
+            # Claimed in write-behind mode and not flushed yet, or not appended yet
+            return {"status": "pending", "receipt": receipt, "ballot_hash": ballot_hex}
+
+        cursor.execute("SELECT tree_size FROM receipt_log_head WHERE id = 1")
+        current = cursor.fetchone()[0]
+        if tree_size is None:
+            tree_size = current
+        elif not index < tree_size <= current:
+            raise InvalidTreeSize(f"tree_size must be between {index + 1} and {current}.")
+
+        ranges = _proof_ranges(index, 0, tree_size)
+        keys = [(0, index)] + _perfect_nodes(0, tree_size)
+        for start, end in ranges:
+            keys.extend(_perfect_nodes(start, end))
+        nodes = _load_nodes(cursor, keys)
+    finally:
+        cursor.close()
+
+    audit_path = [_fold([nodes[key] for key in _perfect_nodes(start, end)]).hex()
+                  for start, end in ranges]
+    return {
+        "status": "included",
+        "receipt": receipt,
+        "ballot_hash": ballot_hex,
+        "leaf_hash": nodes[(0, index)].hex(),
+        "leaf_index": index,
+        "tree_size": tree_size,
+        "root": _fold([nodes[key] for key in _perfect_nodes(0, tree_size)]).hex(),
+        "audit_path": audit_path,
+    }
+
+
+# ---- sequencer ----
+
+class ReceiptSequencer:
+    def __init__(self, connect, interval=1.0, batch_size=1000):
+        self._connect = connect
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"appended": 0, "batches": 0, "errors": 0, "last_append_seconds": None}
+
+    def notify(self):
+        """A ballot was just committed in this process; append soon."""
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        # Started on first use, so each worker runs its own after fork
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="receipt-sequencer",
+                                                    daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while self._append_batch() == self.batch_size:
+                    pass
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                log.warning("receipt log append failed, retrying", exc_info=True)
+
+    def _append_batch(self):
+        started = time.monotonic()
+        conn = self._connect()
+        try:
+            appended = append_pending(conn, self.batch_size)
+        finally:
+            conn.close()
+        if appended:
+            with self._lock:
+                self._stats["appended"] += appended
+                self._stats["batches"] += 1
+                self._stats["last_append_seconds"] = round(time.monotonic() - started, 4)
+        return appended
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
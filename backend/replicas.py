@@ -0,0 +1,219 @@
+import itertools
+import logging
+import threading
+import time
+
+from flask import has_request_context, request
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Read replicas
+# ----------------------------
+# Read-only routes (ballot, candidate and partylist lists, profiles, admin
+# listings) can be served by MySQL replicas, leaving the primary to the
+# vote writes. ReplicaRouter.connect() picks a replica, round robin, and
+# falls back to the primary when:
+#
+#   * no replica is healthy: a background thread checks each replica's
+#     lag every check_interval seconds, and one that lags more than
+#     max_lag, has stopped replicating or cannot be reached is skipped;
+#   * the request made its own write a moment ago: every successful
+#     POST/PUT/DELETE sets a short cookie, and while it is present that
+#     user's reads go to the primary (read-your-writes, on every worker);
+#   * data behind a shared cache just changed in this worker
+#     (pin_primary()), so the cache is not refilled from a replica that
+#     has not caught up yet;
+#   * the replica's pool has no free connection within a short timeout.
+#
+# Writes always use get_db_connection() and the primary.
+
+STICKY_COOKIE = "vwise_primary"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class Replica:
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag = None
+        self.error = None
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas, wrap=None, max_lag=2.0, check_interval=5.0,
+                 sticky_seconds=10.0):
+        """primary() returns a primary connection; replicas is [(name, pool)];
+        wrap(conn) is applied to replica connections (metrics)."""
+        self._primary = primary
+        self.replicas = [Replica(name, pool) for name, pool in replicas]
+        self._wrap = wrap or (lambda conn: conn)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+
+        self._lock = threading.Lock()
+        self._monitor_lock = threading.Lock()
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._thread = None
+        self._stop = threading.Event()
+        self._pinned_until = 0.0
+        self._reads = {"replica": 0, "primary": 0, "fallback": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def init_app(self, app):
+        if self.enabled:
+            app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(STICKY_COOKIE, "1", max_age=int(self.sticky_seconds),
+                                httponly=True, samesite="Lax")
+        return response
+
+    # ---- routing ----
+
+    def pin_primary(self, seconds=None):
+        """Read from the primary for a while in this worker."""
+        with self._lock:
+            self._pinned_until = time.monotonic() + (seconds or self.sticky_seconds)
+
+    def _wants_primary(self):
+        if time.monotonic() < self._pinned_until:
+            return True
+        return has_request_context() and STICKY_COOKIE in request.cookies
+
+    def connect(self):
+        """A connection for read-only queries."""
+        if not self.enabled:
+            return self._primary()
+        self._ensure_monitor()
+        if self._wants_primary():
+            self._count("primary")
+            return self._primary()
+
+        with self._lock:
+            candidates = [next(self._cycle) for _ in self.replicas]
+        for replica in candidates:
+            if not replica.healthy:
+                continue
+            try:
+                conn = replica.pool.get()
+            except Exception as e:
+                log.warning("replica checkout failed", extra={"replica": replica.name, "error": str(e)})
+                continue
+            self._count("replica")
+            return self._wrap(conn)
+
+        self._count("fallback")
+        return self._primary()
+
+    def _count(self, kind):
+        with self._lock:
+            self._reads[kind] += 1
+
+    # ---- lag monitor ----
+
+    def _ensure_monitor(self):
+        # Started on first use, so each worker runs its own after fork.
+        # Replicas start out unhealthy: reads use the primary until the
+        # thread's first probe, which no request waits for.
+        if self._thread is None or not self._thread.is_alive():
+            with self._monitor_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="replica-monitor",
+                                                    daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self.check_all()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def check_all(self):
+        for replica in self.replicas:
+            self._check(replica)
+
+    def _check(self, replica):
+        try:
+            conn = replica.pool.get()
+        except Exception as e:
+            self._mark(replica, None, f"unreachable: {e}")
+            return
+        try:
+            lag = replication_lag(conn)
+        except Exception as e:
+            self._mark(replica, None, f"status check failed: {e}")
+            return
+        finally:
+            conn.close()
+        if lag is None:
+            self._mark(replica, None, "not replicating")
+        elif lag > self.max_lag:
+            self._mark(replica, lag, f"lagging {lag}s")
+        else:
+            self._mark(replica, lag, None)
+
+    def _mark(self, replica, lag, error):
+        healthy = error is None
+        if healthy != replica.healthy:
+            if healthy:
+                log.info("replica back in rotation", extra={"replica": replica.name, "lag": lag})
+            else:
+                log.warning("replica out of rotation", extra={"replica": replica.name, "error": error})
+        replica.healthy = healthy
+        replica.lag = lag
+        replica.error = error
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            reads = dict(self._reads)
+        return {
+            "enabled": self.enabled,
+            "max_lag": self.max_lag,
+            "reads": reads,
+            "replicas": [
+                {"name": r.name, "healthy": r.healthy, "lag": r.lag, "error": r.error,
+                 "pool": r.pool.stats()}
+                for r in self.replicas
+            ],
+        }
+
+
+def replication_lag(conn):
+    """Seconds the replica is behind its source, or None if not replicating."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")  # MySQL 8.0.22+
+        except Exception:
+            cursor.execute("SHOW SLAVE STATUS")
+        row = cursor.fetchone()
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    if not row:
+        return None
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+def parse_replicas(value, default_port=3306):
+    """Parse "host:port,host2" into [(host, port), ...]."""
+    replicas = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append((host, int(port) if port else default_port))
+    return replicas
@@ -0,0 +1,192 @@
+import gzip
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; clients fall back to gzip
+    brotli = None
+
+from flask import Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+
+# ----------------------------
+# JSON responses
+# ----------------------------
+# Every jsonify() goes through FastJSONProvider, which encodes with orjson
+# when it is installed (several times faster than the json module on the
+# candidate lists). Dates, Decimals and key order come out exactly as they
+# did with Flask's encoder, so clients see the same documents.
+#
+# Compression compresses JSON bodies over min_size with brotli or gzip,
+# whichever the client prefers. Bodies with an ETag (the ballot) are
+# compressed once per version and kept; the ETag becomes weak so
+# If-None-Match still matches across encodings.
+#
+# json_array() streams long lists: rows are encoded (and compressed) a
+# chunk at a time instead of building the whole body first.
+
+JSON_MIMETYPES = ("application/json",)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+STREAM_CHUNK_ITEMS = 100
+
+
+def dumps(obj, default=None, sort_keys=False):
+    """Compact JSON as bytes."""
+    if orjson is not None:
+        # Datetimes go to default too, so they keep Flask's format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, default=default, sort_keys=sort_keys,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.default, self.sort_keys).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        if self._app.debug:
+            return super().response(*args, **kwargs)  # pretty-printed
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.default, self.sort_keys),
+                                        mimetype=self.mimetype)
+
+
+def choose_encoding(accept_encodings):
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return accept_encodings.best_match(offered)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class Compression:
+    def __init__(self, min_size=1024, cache_size=32):
+        self.min_size = min_size
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # (etag, encoding) -> compressed body
+        self._cache = OrderedDict()
+
+    def init_app(self, app):
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in JSON_MIMETYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        etag, _ = response.get_etag()
+        compressed = self._compressed(body, encoding, etag)
+        if len(compressed) >= len(body):
+            return response
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compressed(self, body, encoding, etag):
+        if not etag:
+            return compress(body, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+
+# ---- streaming ----
+
+class _StreamCompressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "gzip":
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip header
+
+    def write(self, data):
+        if self.encoding is None:
+            return data
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        if self.encoding is None:
+            return b""
+        return self._c.finish() if self.encoding == "br" else self._c.flush()
+
+
+def stream_array(rows, default=None, sort_keys=False, transform=None, encoding=None,
+                 chunk_items=STREAM_CHUNK_ITEMS):
+    """Yield a JSON array of rows in chunks, optionally compressed."""
+    compressor = _StreamCompressor(encoding)
+    parts = [b"["]
+    for i, row in enumerate(rows):
+        if transform is not None:
+            transform(row)
+        if i:
+            parts.append(b",")
+        parts.append(dumps(row, default, sort_keys))
+        if (i + 1) % chunk_items == 0:
+            yield compressor.write(b"".join(parts))
+            parts = []
+    parts.append(b"]")
+    yield compressor.write(b"".join(parts)) + compressor.close()
+
+
+def json_array(rows, transform=None, stream_min_items=500):
+    """jsonify(rows), streamed when there are at least stream_min_items rows.
+
+    transform(row) is applied to each row just before it is encoded.
+    """
+    if len(rows) < stream_min_items:
+        if transform is not None:
+            for row in rows:
+                transform(row)
+        return current_app.json.response(rows)
+
+    provider = current_app.json
+    encoding = choose_encoding(request.accept_encodings)
+    response = Response(
+        stream_array(rows, provider.default, provider.sort_keys, transform, encoding),
+        mimetype="application/json",
+    )
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+import time
+
+from tally import ballots_cast, get_turnout, load_live
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Live results stream (Server-Sent Events)
+# ----------------------------
+# One producer thread per worker watches the ballots-cast counter. When it
+# moves, the producer reloads results and turnout once, works out what
+# changed and serializes the update once; every open dashboard stream then
+# just writes those bytes. However many dashboards are open, the database
+# sees one cheap counter read per poll.
+#
+# Updates are coalesced: the producer publishes at most once per
+# min_interval, so a burst of ballots becomes a single update. A client
+# that missed an update (slow connection) gets a full snapshot instead of
+# a delta. Without subscribers the producer does no work.
+#
+# Each stream holds a server thread, so streams per worker are capped and
+# closed after max_stream_seconds; EventSource reconnects by itself
+# (possibly to another worker) and clients past the cap fall back to
+# polling.
+
+class ResultsBroadcaster:
+    def __init__(self, connect, poll_interval=1.0, min_interval=0.5, refresh_interval=30.0,
+                 max_subscribers=2, heartbeat=15.0, max_stream_seconds=300.0):
+        self._connect = connect
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        # Candidate approvals do not move the counter; reload anyway this often.
+        self.refresh_interval = refresh_interval
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.max_stream_seconds = max_stream_seconds
+
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._subscribers = 0
+        # Latest published update: (seq, snapshot message, delta message or None)
+        self._seq = 0
+        self._message = None
+        self._published = 0
+
+    # ---- producer ----
+
+    def notify(self):
+        """A ballot was just committed in this process; check soon."""
+        self._wake.set()
+
+    def _run(self):
+        last_ballots = None
+        last_snapshot = None
+        last_load = 0.0
+        while True:
+            with self._cond:
+                if not self._subscribers:
+                    # Idle until someone subscribes, then start from a fresh load.
+                    self._cond.wait_for(lambda: self._subscribers > 0)
+                    last_ballots = None
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+            try:
+                ballots = ballots_cast(self._connect)
+                if ballots == last_ballots and time.monotonic() - last_load < self.refresh_interval:
+                    continue
+                results, voted = load_live(self._connect)
+                turnout = get_turnout(self._connect)
+            except Exception:
+                log.exception("results stream could not load results")
+                time.sleep(self.poll_interval)
+                continue
+            last_ballots = ballots
+            last_load = time.monotonic()
+
+            snapshot = {"results": results, "turnout": turnout}
+            if snapshot != last_snapshot:
+                self._publish(snapshot, last_snapshot)
+                last_snapshot = snapshot
+            # Coalesce: ballots arriving meanwhile go out in the next update.
+            time.sleep(self.min_interval)
+
+    def _publish(self, snapshot, previous):
+        delta = diff(previous, snapshot) if previous else None
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._message = (
+                seq,
+                format_event("snapshot", seq, snapshot),
+                format_event("delta", seq, delta) if delta is not None else None,
+            )
+            self._published += 1
+            self._cond.notify_all()
+
+    def _ensure_producer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="results-stream", daemon=True)
+            self._thread.start()
+
+    # ---- subscribers ----
+
+    def subscribe(self):
+        """Return an SSE generator, or None when this worker is at its cap."""
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+            self._ensure_producer()
+            self._cond.notify_all()
+        self._wake.set()
+        return self._stream()
+
+    def _stream(self):
+        try:
+            yield "retry: 3000\n\n"
+            seen = None
+            deadline = time.monotonic() + self.max_stream_seconds
+            while time.monotonic() < deadline:
+                with self._cond:
+                    if self._message is None or self._message[0] == seen:
+                        self._cond.wait(self.heartbeat)
+                    message = self._message
+                if message is None or message[0] == seen:
+                    # Comment line: keeps proxies from closing the connection
+                    # and lets the server notice clients that went away.
+                    yield ": keep-alive\n\n"
+                    continue
+                seq, snapshot, delta = message
+                # A delta only applies on top of the update right before it.
+                yield delta if delta is not None and seen == seq - 1 else snapshot
+                seen = seq
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self._subscribers,
+                "max_subscribers": self.max_subscribers,
+                "published": self._published,
+                "seq": self._seq,
+            }
+
+
+def diff(previous, current):
+    """Changed candidates and turnout, or None when the ballot itself changed."""
+    before = {r["candidate_id"]: r for r in previous["results"]}
+    after = {r["candidate_id"]: r for r in current["results"]}
+    if before.keys() != after.keys():
+        return None  # candidates were approved or removed: send a snapshot
+    changed = [row for cid, row in after.items() if row != before[cid]]
+    delta = {"results": changed}
+    if current["turnout"] != previous["turnout"]:
+        delta["turnout"] = current["turnout"]
+    return delta
+
+
+def format_event(event, seq, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
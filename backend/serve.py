@@ -0,0 +1,130 @@
+"""Production server for the voting app.
+
+Runs app.py under gunicorn: a master process that pre-forks one worker per
+CPU core (VWISE_WORKERS), each serving VWISE_THREADS requests at a time.
+The master restarts workers that die, recycles them after
+VWISE_MAX_REQUESTS requests, and on SIGHUP replaces every worker without
+dropping in-flight requests. SIGTERM stops gracefully.
+
+Where gunicorn cannot run (Windows: no fork), falls back to waitress with
+a single process and the same total number of request threads.
+
+    python serve.py                     # or: python check_connections.py --prod
+    VWISE_WORKERS=8 VWISE_BIND=0.0.0.0:8000 python serve.py
+
+Load balancers should poll /ready, not /ping.
+"""
+import os
+import sys
+
+import config
+from config import (
+    SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_GRACEFUL_TIMEOUT,
+    SERVER_MAX_REQUESTS, DB_MAX_CONNECTIONS,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker_pool_size(workers, threads):
+    """DB connections per worker: one per request thread, within the budget."""
+    return max(1, min(threads, DB_MAX_CONNECTIONS // max(1, workers)))
+
+
+def set_pool_size(size):
+    # Workers import app.py after this runs (gunicorn forks before loading
+    # the app), so they pick up the new value. An explicit
+    # VWISE_DB_POOL_SIZE always wins.
+    if "VWISE_DB_POOL_SIZE" in os.environ:
+        return config.DB_POOL_SIZE
+    config.DB_POOL_SIZE = size
+    os.environ["VWISE_DB_POOL_SIZE"] = str(size)
+    return size
+
+
+# =========================
+# GUNICORN
+# =========================
+
+def worker_exit(server, worker):
+    # Flush the write-behind vote queue and close DB connections before the
+    # worker goes away (graceful restart, max_requests recycling, shutdown).
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.stop_background_services()
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class VwiseApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    pool_size = set_pool_size(worker_pool_size(SERVER_WORKERS, SERVER_THREADS))
+    print(f"Serving on {SERVER_BIND}: {SERVER_WORKERS} workers x {SERVER_THREADS} threads, "
+          f"{pool_size} DB connections per worker")
+
+    VwiseApplication({
+        "bind": SERVER_BIND,
+        "workers": SERVER_WORKERS,
+        "worker_class": "gthread",
+        "threads": SERVER_THREADS,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT,
+        "timeout": max(60, SERVER_GRACEFUL_TIMEOUT),
+        "max_requests": SERVER_MAX_REQUESTS,
+        # Spread recycling out so the workers do not all restart together
+        "max_requests_jitter": SERVER_MAX_REQUESTS // 10,
+        "worker_exit": worker_exit,
+        "chdir": BASE_DIR,
+        "accesslog": "-",
+    }).run()
+
+
+# =========================
+# WAITRESS (Windows)
+# =========================
+
+def run_waitress():
+    from waitress import serve
+
+    threads = SERVER_WORKERS * SERVER_THREADS
+    pool_size = set_pool_size(worker_pool_size(1, threads))
+    print(f"Serving on {SERVER_BIND} with waitress: 1 process x {threads} threads, "
+          f"{pool_size} DB connections")
+
+    from app import app, stop_background_services
+    try:
+        serve(app, listen=SERVER_BIND, threads=threads)
+    finally:
+        stop_background_services()
+
+
+def main():
+    # Fingerprinted static files for asset_url(); unchanged files are skipped
+    from assets import build_assets
+    build_assets(config.ASSET_BUILD_DIR)
+
+    try:
+        import gunicorn  # noqa: F401
+        has_gunicorn = os.name != "nt"
+    except ImportError:
+        has_gunicorn = False
+
+    if has_gunicorn:
+        run_gunicorn()
+    else:
+        run_waitress()
+
+
+if __name__ == "__main__":
+    main()
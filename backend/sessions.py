@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+# ----------------------------
+# Server-side sessions
+# ----------------------------
+# The session cookie only carries a random token. The session itself (user
+# id, role, timestamps) lives in a shared store that every worker process
+# can read, so a session survives worker restarts and an admin can list
+# and revoke sessions. Stores are keyed by the SHA-256 of the token, so
+# reading the store does not hand out usable cookies.
+#
+# Each worker keeps recently used sessions in an in-memory LRU, so
+# login_required() normally costs a dict lookup. A cached entry is
+# re-read from the shared store after SESSION_CACHE_SECONDS, which bounds
+# how long a session revoked by another worker keeps working there.
+#
+# Backends: SqliteSessionBackend (default; one local file shared by the
+# workers) and MemorySessionBackend (single process, nothing persisted).
+
+
+def session_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}  # key -> (user_id, data, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+        if row is None or row[2] <= time.time():
+            return None
+        return row[1]
+
+    def set(self, key, user_id, data, expires_at):
+        with self._lock:
+            self._rows[key] = (user_id, data, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._rows.pop(key, None)
+
+    def delete_user(self, user_id, keep=None):
+        with self._lock:
+            keys = [k for k, row in self._rows.items() if row[0] == user_id and k != keep]
+            for k in keys:
+                del self._rows[k]
+        return keys
+
+    def list_active(self):
+        now = time.time()
+        with self._lock:
+            return [(k, row[1]) for k, row in self._rows.items() if row[2] > now]
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            for k in [k for k, row in self._rows.items() if row[2] <= now]:
+                del self._rows[k]
+
+
+class SqliteSessionBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                key TEXT PRIMARY KEY,
+                user_id INTEGER,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def _conn(self):
+        # One connection per thread, opened after fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, user_id, data, expires_at):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (key, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+            (key, user_id, json.dumps(data), expires_at),
+        )
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def delete_user(self, user_id, keep=None):
+        conn = self._conn()
+        keys = [row[0] for row in conn.execute(
+            "SELECT key FROM sessions WHERE user_id = ? AND key != ?", (user_id, keep or "")
+        )]
+        conn.executemany("DELETE FROM sessions WHERE key = ?", [(k,) for k in keys])
+        return keys
+
+    def list_active(self):
+        return [(key, json.loads(data)) for key, data in self._conn().execute(
+            "SELECT key, data FROM sessions WHERE expires_at > ? ORDER BY expires_at DESC",
+            (time.time(),),
+        )]
+
+    def purge(self):
+        self._conn().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+
+class SessionStore:
+    """LRU cache in front of a shared backend."""
+
+    def __init__(self, backend, ttl=43200, cache_size=10000, cache_seconds=5.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # key -> (cached_until, data)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > now:
+                self._cache.move_to_end(key)
+                return entry[1]
+        data = self.backend.get(key)
+        if data is None:
+            self._forget(key)
+        else:
+            self._remember(key, data)
+        return data
+
+    def save(self, key, data):
+        data["expires_at"] = time.time() + self.ttl
+        self.backend.set(key, data.get("user_id"), data, data["expires_at"])
+        self._remember(key, data)
+        # Expired rows are cleared now and then rather than on a timer
+        if random.random() < 0.01:
+            self.backend.purge()
+
+    def delete(self, key):
+        self.backend.delete(key)
+        self._forget(key)
+
+    def revoke_user(self, user_id, keep=None):
+        keys = self.backend.delete_user(user_id, keep)
+        for key in keys:
+            self._forget(key)
+        return len(keys)
+
+    def list_active(self):
+        return self.backend.list_active()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_seconds, data)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+
+# ----------------------------
+# Flask integration
+# ----------------------------
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, token=None, meta=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial or {}, on_update)
+        self.token = token
+        self.meta = meta  # the stored record: timestamps, ip, ...
+        self.new = token is None
+        self.modified = False
+        self.previous_key = None
+
+    def regenerate(self):
+        """New token on login, so a token planted before login is useless."""
+        if self.token is not None:
+            self.previous_key = session_key(self.token)
+        self.token = None
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    # Sessions are written back at most this often when only last_seen changed
+    refresh_seconds = 60
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        token = request.cookies.get(self.get_cookie_name(app))
+        if token:
+            data = self.store.get(session_key(token))
+            if data is not None:
+                return ServerSession(data.get("session"), token, data)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_key:
+            self.store.delete(session.previous_key)
+
+        if not session:
+            if session.token is not None and session.modified:
+                self.store.delete(session_key(session.token))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        meta = session.meta
+        if not session.modified and meta and now - meta.get("last_seen", 0) < self.refresh_seconds:
+            return
+
+        if session.token is None:
+            session.token = secrets.token_urlsafe(32)
+            meta = None
+        data = {
+            "session": dict(session),
+            "user_id": session.get("user_id"),
+            "role": session.get("role"),
+            "created": meta["created"] if meta else now,
+            "last_seen": now,
+            "ip": request.remote_addr,
+            "user_agent": (request.user_agent.string or "")[:200],
+        }
+        self.store.save(session_key(session.token), data)
+        session.meta = data
+
+        response.set_cookie(
+            name,
+            session.token,
+            max_age=self.store.ttl,
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path,
+        )
+
+
+def load_secret_key(path):
+    """The app secret: VWISE_SECRET_KEY, else one generated once per install."""
+    key = os.environ.get("VWISE_SECRET_KEY")
+    if key:
+        return key
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secrets.token_hex(32))
+    try:
+        # link() fails if another worker got there first; then use its key
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path) as f:
+        return f.read().strip()
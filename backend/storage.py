@@ -0,0 +1,281 @@
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+
+
+# ----------------------------
+# Storage backends
+# ----------------------------
+# The app talks to its database through connections with the
+# mysql.connector API: conn.cursor(dictionary=True), %s placeholders,
+# commit()/rollback(). MySQLStorage hands out real mysql.connector
+# connections. SqliteStorage hands out SqliteConnection, which speaks the
+# same API over one local SQLite file, so the same queries run on a
+# single-node polling station or in a test run with no MySQL server.
+#
+# The SQL in the app is written for MySQL. SqliteCursor rewrites the few
+# MySQL-only constructs it uses (see translate()) once per distinct
+# statement; the migrations check the dialect where they read
+# information_schema.
+#
+# SQLite setup: WAL, so readers never block the writer or each other, and
+# write transactions start with BEGIN IMMEDIATE, so two writers queue on
+# the busy timeout instead of failing when one upgrades a read lock.
+# SELECT ... FOR UPDATE becomes BEGIN IMMEDIATE: the whole database is
+# locked for writing, which is what the row locks protected.
+
+
+class MySQLStorage:
+    dialect = "mysql"
+
+    def __init__(self, config):
+        import mysql.connector
+
+        self.config = dict(config)
+        self.errors = (mysql.connector.Error,)
+        self._mysql = mysql.connector
+
+    def describe(self):
+        return f"MySQL {self.config['host']}:{self.config['port']}/{self.config['database']}"
+
+    def connect(self, **kwargs):
+        return self._mysql.connect(**dict(self.config, **kwargs))
+
+    def create_database(self):
+        """Create the database on a fresh server; returns a connection to it."""
+        server_config = dict(self.config)
+        database = server_config.pop("database")
+        conn = self._mysql.connect(connection_timeout=5, **server_config)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARACTER SET utf8mb4")
+        cursor.execute(f"USE `{database}`")
+        cursor.close()
+        return conn
+
+
+class SqliteStorage:
+    dialect = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path, busy_timeout=5.0, synchronous="FULL", cache_mb=64, mmap_mb=256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        # FULL: a committed ballot survives a power cut. NORMAL is faster;
+        # in WAL mode it can lose the last commits, never corrupt the file.
+        self.synchronous = synchronous
+        self.cache_mb = cache_mb
+        self.mmap_mb = mmap_mb
+
+    def describe(self):
+        return f"SQLite {self.path}"
+
+    def connect(self, **kwargs):
+        raw = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            # Implicit transactions start with BEGIN IMMEDIATE
+            isolation_level="IMMEDIATE",
+            # Pooled connections move between request threads (one at a time)
+            check_same_thread=False,
+        )
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute(f"PRAGMA synchronous = {self.synchronous}")
+        raw.execute(f"PRAGMA cache_size = -{self.cache_mb * 1024}")
+        raw.execute(f"PRAGMA mmap_size = {self.mmap_mb * 1024 * 1024}")
+        raw.execute("PRAGMA temp_store = MEMORY")
+        return SqliteConnection(raw)
+
+    def create_database(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        return self.connect()
+
+
+def drop_tables(conn):
+    """Empty the database (scratch databases for benchmarks)."""
+    cursor = conn.cursor()
+    cursor.execute("SHOW TABLES")
+    for (table,) in cursor.fetchall():
+        cursor.execute(f"DROP TABLE `{table}`")
+    conn.commit()
+    cursor.close()
+
+
+def make_storage(backend, mysql_config, sqlite_path, sqlite_synchronous="FULL"):
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_path, synchronous=sqlite_synchronous)
+    if backend == "mysql":
+        return MySQLStorage(mysql_config)
+    raise ValueError(f"unknown database backend {backend!r} (expected mysql or sqlite)")
+
+
+# ---- SQLite connections ----
+
+class SqliteConnection:
+    dialect = "sqlite"
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @property
+    def in_transaction(self):
+        # ConnectionPool.release rolls back when this is true
+        return self.raw.in_transaction
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SqliteCursor(self.raw, dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+    def ping(self, reconnect=False):
+        self.raw.execute("SELECT 1").fetchone()
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+class SqliteCursor:
+    dialect = "sqlite"
+
+    def __init__(self, raw, dictionary=False):
+        self._raw = raw
+        self._cursor = raw.cursor()
+        self._dictionary = dictionary
+        self._names = None
+
+    def execute(self, sql, params=()):
+        sql, lock = translate(sql)
+        if lock and not self._raw.in_transaction:
+            self._raw.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(sql, params or ())
+        self._described()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        sql, _ = translate(sql)
+        self._cursor.executemany(sql, seq_of_params)
+        self._described()
+        return self
+
+    def _described(self):
+        description = self._cursor.description
+        self._names = [d[0] for d in description] if description and self._dictionary else None
+
+    def _row(self, row):
+        if row is None or self._names is None:
+            return row
+        return dict(zip(self._names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [self._row(row) for row in rows]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ---- MySQL -> SQLite ----
+
+_NOW = "datetime('now', 'localtime')"
+
+_REWRITES = [
+    # DDL
+    (re.compile(r"\b(?:BIG)?INT\s+NOT\s+NULL\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.I),
+     "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\)\s*ENGINE\s*=\s*\w+(?:\s+DEFAULT\s+CHARSET\s*=\s*\w+)?", re.I), ")"),
+    (re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.I), f"DEFAULT ({_NOW})"),
+    (re.compile(r"\bDROP\s+INDEX\s+(\w+)\s+ON\s+\w+", re.I), r"DROP INDEX \1"),
+    # Functions and casts
+    (re.compile(r"\bNOW\(\)", re.I), _NOW),
+    (re.compile(r"\bREPLACE\(\s*UUID\(\)\s*,\s*'-'\s*,\s*''\s*\)", re.I), "lower(hex(randomblob(16)))"),
+    (re.compile(r"\bUUID\(\)", re.I), "lower(hex(randomblob(16)))"),
+    (re.compile(r"\bAS\s+(?:UNSIGNED|SIGNED)(?:\s+INTEGER)?\s*\)", re.I), "AS INTEGER)"),
+    # INSERT variants
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I), "ON CONFLICT DO UPDATE SET"),
+]
+
+_SHOW_TABLES = re.compile(r"^\s*SHOW\s+TABLES(?:\s+LIKE\s+('[^']*'))?\s*;?\s*$", re.I)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_VALUES_OF = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """MySQL statement -> (SQLite statement, needs a write lock)."""
+    show = _SHOW_TABLES.match(sql)
+    if show:
+        query = "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        if show.group(1):
+            query += f" AND name LIKE {show.group(1)}"
+        return query, False
+
+    lock = bool(_FOR_UPDATE.search(sql))
+    if lock:
+        sql = _FOR_UPDATE.sub("", sql)
+    upsert = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, re.I)
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+    if upsert:
+        # VALUES(col) in the update list is the row that was not inserted
+        head, marker, update = sql.partition("ON CONFLICT DO UPDATE SET")
+        sql = head + marker + _VALUES_OF.sub(r"excluded.\1", update)
+    sql = _PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", sql)
+    return sql, lock
+
+
+# DATETIME columns round-trip as datetime, like mysql.connector
+def _adapt_datetime(value):
+    return value.isoformat(" ", "seconds")
+
+
+def _convert_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_datetime)
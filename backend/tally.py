@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+
+from positions import position_name, position_number
+
+
+# ----------------------------
+# Live tally
+# ----------------------------
+# Results are never computed from the votes table on a read. Every ballot
+# transaction also bumps counters in vote_tallies (per candidate) and
+# tally_totals (ballots cast), so reading results costs O(candidates).
+#
+# Each counter is split over TALLY_SHARDS rows and a transaction picks one
+# shard at random. Without that, every concurrent ballot would queue on
+# the same President row lock until the previous ballot commits.
+
+TALLY_SHARDS = 8
+
+# Reads are cached briefly so any number of open dashboards share a query.
+RESULTS_CACHE_SECONDS = 2.0
+STUDENT_COUNT_CACHE_SECONDS = 30.0
+
+
+def rebuild_tallies(conn):
+    """Recompute the counters from the votes table (one full scan).
+
+    Migration 006 seeds the counters; this is for running by hand if they
+    are ever suspected to be wrong.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM vote_tallies")
+        cursor.execute("DELETE FROM tally_totals")
+        cursor.execute("""
+            INSERT INTO vote_tallies (candidate_id, shard, position, votes)
+            SELECT candidate_id, 0, MIN(position), COUNT(*)
+            FROM votes
+            GROUP BY candidate_id
+        """)
+        cursor.execute("""
+            INSERT INTO tally_totals (name, shard, value)
+            SELECT 'ballots', 0, COUNT(DISTINCT user_id) FROM votes
+        """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    results_cache.clear()
+
+
+def record_ballots(cursor, ballot_rows):
+    """Add committed-to-be ballots to the counters.
+
+    Call inside the transaction that inserts the votes. ballot_rows is a
+    list with one [(candidate_id, position), ...] entry per ballot.
+    """
+    if not ballot_rows:
+        return
+    counts = {}
+    for rows in ballot_rows:
+        for candidate_id, position in rows:
+            key = (candidate_id, position)
+            counts[key] = counts.get(key, 0) + 1
+
+    shard = random.randrange(TALLY_SHARDS)
+    # Lock counter rows in a fixed order so concurrent ballots cannot deadlock.
+    items = sorted(counts.items())
+    values = ", ".join(["(%s, %s, %s, %s)"] * len(items))
+    params = []
+    for (candidate_id, position), votes in items:
+        params.extend((candidate_id, shard, position, votes))
+    cursor.execute(f"""
+        INSERT INTO vote_tallies (candidate_id, shard, position, votes)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE votes = votes + VALUES(votes)
+    """, params)
+    cursor.execute("""
+        INSERT INTO tally_totals (name, shard, value)
+        VALUES ('ballots', %s, %s)
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+    """, (shard, len(ballot_rows)))
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+
+class TTLCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get_or_load(self, key, ttl, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        value = load()
+        with self._lock:
+            self._entries[key] = (now + ttl, value)
+        return value
+
+    def put(self, key, ttl, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+results_cache = TTLCache()
+
+
+def _with_connection(connect, load):
+    conn = connect()
+    try:
+        return load(conn)
+    finally:
+        conn.close()
+
+
+def _load_results(conn):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT c.id, c.first_name, c.last_name, c.college, c.position,
+                   COALESCE(SUM(t.votes), 0) AS vote_count
+            FROM candidates c
+            LEFT JOIN vote_tallies t ON t.candidate_id = c.id
+            WHERE c.approved = 1
+            GROUP BY c.id, c.first_name, c.last_name, c.college, c.position
+        """)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    position_totals = {}
+    for row in rows:
+        row['vote_count'] = int(row['vote_count'])
+        row['position'] = position_number(row['position'])
+        position_totals[row['position']] = position_totals.get(row['position'], 0) + row['vote_count']
+
+    results = []
+    for row in rows:
+        total = position_totals[row['position']]
+        results.append({
+            'candidate_id': row['id'],
+            'full_name': f"{row['first_name']} {row['last_name']}",
+            'department': row['college'],
+            'position': row['position'],
+            'position_name': position_name(row['position']),
+            'vote_count': row['vote_count'],
+            'vote_percentage': round(row['vote_count'] * 100.0 / total, 2) if total else 0.0,
+        })
+    results.sort(key=lambda r: (r['position'], -r['vote_count'], r['full_name']))
+    return results
+
+
+def _load_ballots_cast(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(SUM(value), 0) FROM tally_totals WHERE name = 'ballots'")
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def _load_student_count(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM accounts WHERE UPPER(TRIM(department)) <> 'ADMIN'")
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def get_results(connect):
+    # connect is only called when the cache has expired.
+    return results_cache.get_or_load(
+        'results', RESULTS_CACHE_SECONDS, lambda: _with_connection(connect, _load_results)
+    )
+
+
+def get_turnout(connect):
+    voted = results_cache.get_or_load(
+        'ballots', RESULTS_CACHE_SECONDS, lambda: _with_connection(connect, _load_ballots_cast)
+    )
+    students = results_cache.get_or_load(
+        'students', STUDENT_COUNT_CACHE_SECONDS, lambda: _with_connection(connect, _load_student_count)
+    )
+    return {
+        'total_students': students,
+        'voted_count': voted,
+        'turnout_percentage': round(voted * 100.0 / students, 2) if students else 0.0,
+    }
+
+
+def load_live(connect):
+    """Uncached (results, ballots cast) for the results stream.
+
+    Also refreshes the read cache, so polling dashboards see the same numbers.
+    """
+    def load(conn):
+        return _load_results(conn), _load_ballots_cast(conn)
+
+    results, voted = _with_connection(connect, load)
+    results_cache.put('results', RESULTS_CACHE_SECONDS, results)
+    results_cache.put('ballots', RESULTS_CACHE_SECONDS, voted)
+    return results, voted
+
+
+def ballots_cast(connect):
+    """Uncached ballots cast; one indexed read of tally_totals."""
+    return _with_connection(connect, _load_ballots_cast)
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+
+from db_pool import ConnectionPool
+from storage import SqliteStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "pool.sqlite3"), busy_timeout=0.2)
+    conn = storage.connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    return storage
+
+
+def test_failed_write_leaves_no_open_transaction(storage):
+    pool = ConnectionPool(storage.connect, size=1)
+
+    conn = pool.get()
+    cursor = conn.cursor()
+    with pytest.raises(sqlite3.IntegrityError):
+        cursor.execute("INSERT INTO items (name) VALUES (%s)", (None,))
+    assert conn.in_transaction
+    cursor.close()
+    conn.close()
+
+    # The same connection comes back clean...
+    conn = pool.get()
+    assert not conn.in_transaction
+
+    # ...and nobody else is left waiting on its write lock
+    other = storage.connect()
+    cursor = other.cursor()
+    cursor.execute("INSERT INTO items (name) VALUES (%s)", ("ok",))
+    other.commit()
+    other.close()
+    conn.close()
+
+
+def test_uncommitted_write_is_not_committed_by_next_borrower(storage):
+    pool = ConnectionPool(storage.connect, size=1)
+
+    conn = pool.get()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO items (name) VALUES (%s)", ("left behind",))
+    cursor.close()
+    conn.close()
+
+    conn = pool.get()
+    conn.commit()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM items")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+    conn.close()
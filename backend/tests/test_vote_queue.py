@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+
+import pytest
+
+from ballots import DuplicateVote, claim_ballot
+from migrations import apply_migrations
+from receipt_log import ballot_hash, inclusion_proof
+from storage import SqliteStorage
+from vote_queue import VoteQueue
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "votes.sqlite3"), busy_timeout=2.0)
+    conn = storage.create_database()
+    apply_migrations(conn, report=lambda message: None)
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO candidates (id, first_name, last_name, college, position, approved, created_at) "
+        "VALUES (%s, 'First', 'Last', 'CCS', %s, 1, NOW())",
+        [(1, 1), (2, 1), (3, 2), (4, 2)],
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return storage
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+def make_queue(storage, log_dir):
+    return VoteQueue(log_dir, storage.connect, batch_size=10, flush_interval=0.05, fsync_window=0)
+
+
+def query(storage, sql, params=()):
+    conn = storage.connect()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def record(seq, user_id, rows):
+    return {"seq": seq, "receipt": f"{seq:032x}", "user_id": user_id, "rows": rows,
+            "voted_at": "2026-03-01 08:00:00", "queued_at": 0}
+
+
+def write_orphan(log_dir, records, checkpoint=None, tail=b""):
+    # What a worker that died leaves behind: an unlocked journal and checkpoint
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, "votes-1-dead.log"), "wb") as f:
+        for r in records:
+            f.write(json.dumps(r).encode() + b"\n")
+        f.write(tail)
+    if checkpoint is not None:
+        with open(os.path.join(log_dir, "votes-1-dead.ckpt"), "w") as f:
+            f.write(str(checkpoint))
+
+
+def test_crash_replay_loads_unflushed_ballots(storage, log_dir):
+    write_orphan(log_dir, [record(1, 10, [[1, 1]]), record(2, 11, [[2, 1]]), record(3, 12, [[1, 1], [3, 2]])],
+                 checkpoint=1)
+
+    queue = make_queue(storage, log_dir)
+    queue.start()
+    queue.stop()
+
+    # seq 1 was flushed before the crash (checkpoint); it is not loaded again
+    assert query(storage, "SELECT user_id FROM voter_status ORDER BY user_id") == [(11,), (12,)]
+    assert query(storage, "SELECT user_id, candidate_id FROM votes ORDER BY user_id, candidate_id") == [
+        (11, 2), (12, 1), (12, 3)]
+    assert queue.stats()["replayed"] == 2
+    assert not os.path.exists(os.path.join(log_dir, "votes-1-dead.log"))
+    assert not os.path.exists(os.path.join(log_dir, "votes-1-dead.ckpt"))
+
+
+def test_replay_is_idempotent(storage, log_dir):
+    write_orphan(log_dir, [record(1, 10, [[1, 1]])])
+    queue = make_queue(storage, log_dir)
+    queue.start()
+    queue.stop()
+
+    # Same ballot again, as if the checkpoint had not been written
+    write_orphan(log_dir, [record(1, 10, [[1, 1]])])
+    queue = make_queue(storage, log_dir)
+    queue.start()
+    queue.stop()
+
+    assert query(storage, "SELECT user_id, candidate_id FROM votes") == [(10, 1)]
+
+
+def test_torn_final_line_is_ignored(storage, log_dir):
+    write_orphan(log_dir, [record(1, 10, [[1, 1]]), record(2, 11, [[2, 1]])],
+                 tail=b'{"seq": 3, "receipt": "00000000000000000000000000000003", "user_')
+
+    queue = make_queue(storage, log_dir)
+    queue.start()
+    queue.stop()
+
+    assert query(storage, "SELECT user_id FROM voter_status ORDER BY user_id") == [(10,), (11,)]
+    assert queue.stats()["replayed"] == 2
+
+
+def test_duplicate_across_instances_is_never_acknowledged(storage, log_dir, caplog):
+    first, second = make_queue(storage, log_dir), make_queue(storage, log_dir)
+    first.start()
+    second.start()
+
+    # The same voter on two workers before either flush
+    kept = first.submit(5, [(1, 1), (3, 2)])
+    lost = second.submit(5, [(2, 1), (4, 2)])
+    conn = storage.connect()
+    claim_ballot(conn, 5, kept)
+    with pytest.raises(DuplicateVote):
+        claim_ballot(conn, 5, lost)
+    # Claiming again (a retried request) is harmless
+    claim_ballot(conn, 5, kept)
+    conn.close()
+
+    with caplog.at_level(logging.WARNING, logger="vote_queue"):
+        first.stop()
+        second.stop()
+
+    assert query(storage, "SELECT candidate_id FROM votes WHERE user_id = 5 ORDER BY candidate_id") == [(1,), (3,)]
+    assert query(storage, "SELECT receipt, ballot_hash FROM voter_status WHERE user_id = 5") == [
+        (kept, ballot_hash(kept, [(1, 1), (3, 2)]))]
+    assert first.stats()["flushed"] == 1
+    assert second.stats()["rejected"] == 1
+    assert any(getattr(r, "receipt", None) == lost for r in caplog.records)
+
+
+def test_claimed_receipt_is_pending_until_flushed(storage, log_dir):
+    queue = make_queue(storage, log_dir)
+    queue.flush_interval = 60  # keep it in the queue
+    queue.start()
+    receipt = queue.submit(7, [(1, 1)])
+    conn = storage.connect()
+    claim_ballot(conn, 7, receipt)
+    assert inclusion_proof(conn, receipt)["status"] == "pending"
+    conn.close()
+    queue.stop()
@@ -0,0 +1,325 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines run a single process anyway
+    fcntl = None
+
+from ballots import write_ballots_bulk
+
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Write-behind vote queue
+# ----------------------------
+# submit_vote validates the ballot, then VoteQueue.submit() appends it to a
+# local append-only journal and returns once the line is fsync'd. Ballots
+# arriving within VOTE_FSYNC_WINDOW share a single fsync (group commit).
+# A flusher thread loads queued ballots into MySQL VOTE_FLUSH_BATCH at a
+# time and records the last flushed sequence number in a checkpoint file.
+#
+# Each process owns one journal, locked with flock while it runs. On
+# startup any journal that is not locked belongs to a process that died;
+# its unflushed tail is replayed into MySQL before the file is removed.
+# write_ballots_bulk() is idempotent, so replaying a batch that was
+# committed just before the crash is harmless.
+#
+# The journal is per process, so it cannot stop a voter from submitting on
+# two workers at once. The caller claims the voter_status row with
+# claim_ballot() after submit() and only acknowledges the ballot if the
+# claim succeeds; a journaled ballot that lost the claim is rejected at
+# flush and logged.
+
+
+class VoteQueue:
+    def __init__(self, log_dir, connect, batch_size=500, flush_interval=0.5,
+                 fsync_window=0.005, rotate_bytes=8 * 1024 * 1024):
+        self.log_dir = log_dir
+        self._connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_window = fsync_window
+        self.rotate_bytes = rotate_bytes
+
+        self._name = f"votes-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._log_path = os.path.join(log_dir, self._name + ".log")
+        self._ckpt_path = os.path.join(log_dir, self._name + ".ckpt")
+        self._log = None
+
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)
+        self._flushable = threading.Condition(self._lock)
+        self._to_write = []          # (record, event) waiting for fsync
+        self._queue = deque()        # durable records waiting for MySQL
+        self._pending_users = set()  # users with a queued ballot
+        self._seq = 0
+        self._running = False
+        self._threads = []
+
+        self._stats = {
+            "submitted": 0,
+            "fsyncs": 0,
+            "flushed": 0,
+            "rejected": 0,
+            "flush_batches": 0,
+            "flush_errors": 0,
+            "replayed": 0,
+            "last_flush_at": None,
+            "last_flush_seconds": None,
+        }
+
+    # ---- lifecycle ----
+
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._log = open(self._log_path, "ab")
+        if fcntl:
+            fcntl.flock(self._log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._replay_orphans()
+
+        self._running = True
+        for target in (self._journal_loop, self._flush_loop):
+            t = threading.Thread(target=target, name=f"vote-queue-{target.__name__}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=10.0):
+        """Stop accepting ballots, flush what is queued, remove the journal."""
+        if self._log is None or self._log.closed:
+            return
+        with self._lock:
+            self._running = False
+            self._appended.notify_all()
+            self._flushable.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        if not self._queue and not self._to_write:
+            self._log.close()
+            os.remove(self._log_path)
+            if os.path.exists(self._ckpt_path):
+                os.remove(self._ckpt_path)
+        else:
+            # Left on disk for the next process to replay.
+            self._log.close()
+
+    # ---- submit ----
+
+    def has_pending(self, user_id):
+        with self._lock:
+            return user_id in self._pending_users
+
+    def submit(self, user_id, rows):
+        """Journal a validated ballot; returns its receipt once durable."""
+        event = threading.Event()
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("vote queue is not running")
+            if user_id in self._pending_users:
+                return None
+            self._seq += 1
+            record = {
+                "seq": self._seq,
+                "receipt": uuid.uuid4().hex,
+                "user_id": user_id,
+                "rows": rows,
+                "voted_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "queued_at": time.time(),
+            }
+            self._pending_users.add(user_id)
+            self._to_write.append((record, event))
+            self._stats["submitted"] += 1
+            self._appended.notify()
+        event.wait()
+        if record.get("error"):
+            raise RuntimeError(record["error"])
+        return record["receipt"]
+
+    # ---- journal (group fsync) ----
+
+    def _journal_loop(self):
+        while True:
+            with self._lock:
+                while not self._to_write and self._running:
+                    self._appended.wait()
+                if not self._to_write and not self._running:
+                    return
+            # Let concurrent submitters join this fsync.
+            if self.fsync_window:
+                time.sleep(self.fsync_window)
+            with self._lock:
+                group, self._to_write = self._to_write, []
+
+            error = None
+            try:
+                data = b"".join(
+                    json.dumps(record, separators=(",", ":")).encode() + b"\n"
+                    for record, _ in group
+                )
+                self._log.write(data)
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            except OSError as e:
+                error = f"could not journal ballot: {e}"
+
+            with self._lock:
+                if error:
+                    for record, _ in group:
+                        record["error"] = error
+                        self._pending_users.discard(record["user_id"])
+                else:
+                    self._stats["fsyncs"] += 1
+                    self._queue.extend(record for record, _ in group)
+                    if len(self._queue) >= self.batch_size:
+                        self._flushable.notify()
+            for _, event in group:
+                event.set()
+
+    # ---- flush to MySQL ----
+
+    def _flush_loop(self):
+        backoff = self.flush_interval
+        while True:
+            with self._lock:
+                if self._running and len(self._queue) < self.batch_size:
+                    self._flushable.wait(self.flush_interval)
+                if not self._queue:
+                    if not self._running and not self._to_write:
+                        return
+                    continue
+                batch = [self._queue[i] for i in range(min(self.batch_size, len(self._queue)))]
+
+            started = time.monotonic()
+            try:
+                stored, rejected = self._write(batch)
+            except Exception as e:
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                log.warning("vote queue flush failed, retrying", extra={"error": str(e), "batch": len(batch)})
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                if not self._running:
+                    return
+                continue
+            backoff = self.flush_interval
+
+            self._write_checkpoint(batch[-1]["seq"])
+            with self._lock:
+                for _ in batch:
+                    record = self._queue.popleft()
+                    self._pending_users.discard(record["user_id"])
+                self._stats["flushed"] += len(stored)
+                self._stats["rejected"] += len(rejected)
+                self._stats["flush_batches"] += 1
+                self._stats["last_flush_at"] = time.time()
+                self._stats["last_flush_seconds"] = round(time.monotonic() - started, 4)
+                idle = not self._queue and not self._to_write
+            if idle:
+                self._maybe_rotate()
+
+    def _write(self, batch):
+        conn = self._connect()
+        try:
+            stored, rejected = write_ballots_bulk(conn, [
+                {
+                    "user_id": r["user_id"],
+                    "receipt": r["receipt"],
+                    "voted_at": r["voted_at"],
+                    "rows": [tuple(row) for row in r["rows"]],
+                }
+                for r in batch
+            ])
+        finally:
+            conn.close()
+        for receipt in rejected:
+            log.warning("queued ballot rejected, the voter already has another ballot",
+                        extra={"receipt": receipt})
+        return stored, rejected
+
+    def _write_checkpoint(self, seq):
+        tmp = self._ckpt_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._ckpt_path)
+
+    def _maybe_rotate(self):
+        # Everything in the journal is in MySQL, so it can start over.
+        with self._lock:
+            if self._queue or self._to_write or self._log.tell() < self.rotate_bytes:
+                return
+            self._log.truncate(0)
+            self._log.seek(0)
+            os.fsync(self._log.fileno())
+
+    # ---- crash recovery ----
+
+    def _replay_orphans(self):
+        for log_path in sorted(glob.glob(os.path.join(self.log_dir, "votes-*.log"))):
+            if log_path == self._log_path:
+                continue
+            try:
+                f = open(log_path, "rb")
+            except OSError:
+                continue
+            try:
+                if fcntl:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # still owned by a live process
+                ckpt_path = log_path[:-len(".log")] + ".ckpt"
+                self._replay(f, ckpt_path)
+            finally:
+                f.close()
+            os.remove(log_path)
+            if os.path.exists(ckpt_path):
+                os.remove(ckpt_path)
+
+    def _replay(self, f, ckpt_path):
+        flushed = 0
+        if os.path.exists(ckpt_path):
+            with open(ckpt_path) as ckpt:
+                flushed = int(ckpt.read().strip() or 0)
+
+        batch = []
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn final line from the crash; it was never acknowledged
+            if record["seq"] <= flushed:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                self._stats["replayed"] += len(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+            self._stats["replayed"] += len(batch)
+
+    # ---- admin ----
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            oldest = self._queue[0]["queued_at"] if self._queue else None
+            data.update({
+                "depth": len(self._queue) + len(self._to_write),
+                "awaiting_fsync": len(self._to_write),
+                "flush_lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "journal": self._log_path,
+                "running": self._running,
+            })
+        return data
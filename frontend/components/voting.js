@@ -8,13 +8,63 @@ console.log('=== VOTING PAGE DEBUG ===');
 console.log('Submit button:', submitButton);
 console.log('Positions wrapper:', positionsWrapper);
 
+// When the server is busy it answers 503 (waiting room) or 429 (too many
+// requests) with retry_after; wait that long and try again.
+async function fetchWhenAdmitted(url, options) {
+    while (true) {
+        const response = await fetch(url, options);
+        if (response.status !== 503 && response.status !== 429) {
+            return response;
+        }
+        const data = await response.json().catch(() => ({}));
+        if (!data.retry_after) {
+            return response;
+        }
+        showQueueNotice(data);
+        await new Promise(resolve => setTimeout(resolve, data.retry_after * 1000));
+        hideQueueNotice();
+    }
+}
+
+function showQueueNotice(data) {
+    let notice = document.getElementById('queue-notice');
+    if (!notice) {
+        notice = document.createElement('div');
+        notice.id = 'queue-notice';
+        notice.className = 'error-message';
+        notice.style.cssText = 'text-align: center; padding: 1rem; background: #fff3cd; color: #856404; border-radius: 8px; margin: 1rem 2rem;';
+        positionsWrapper.parentNode.insertBefore(notice, positionsWrapper);
+    }
+    notice.textContent = data.queued
+        ? `Lots of students are voting right now. You are number ${data.position} in line; continuing in ${data.retry_after} seconds...`
+        : `Please wait ${data.retry_after} seconds...`;
+}
+
+function hideQueueNotice() {
+    const notice = document.getElementById('queue-notice');
+    if (notice) notice.remove();
+}
+
 // Fetch candidates and render them
 async function loadCandidates() {
     console.log('🔄 Loading candidates...');
     
     try {
-        const response = await fetch('/get-candidates');
+        const response = await fetchWhenAdmitted('/get-candidates');
         console.log('📡 Response status:', response.status);
+
+        if (response.status === 403) {
+            // Outside the voting window (see /election/status)
+            const data = await response.json().catch(() => ({}));
+            positionsWrapper.innerHTML = `
+                <div class="error-message" style="text-align: center; padding: 3rem; background: #fff3cd; border-radius: 8px; margin: 2rem;">
+                    <h3 style="color: #856404;">Voting Is Not Open</h3>
+                    <p style="color: #856404;">${data.error || 'Voting is not open right now.'}</p>
+                </div>
+            `;
+            if (submitButton) submitButton.style.display = 'none';
+            return;
+        }
         
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
@@ -227,7 +277,7 @@ submitButton.addEventListener('click', function () {
     console.log('🚀 Submitting votes:', votes);
 
     // Send votes to Flask
-    fetch('/submit-vote', {
+    fetchWhenAdmitted('/submit-vote', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -239,7 +289,9 @@ submitButton.addEventListener('click', function () {
         console.log('📬 Server response:', data);
         
         if (data.success) {
-            alert('Your vote has been successfully submitted!');
+            alert('Your vote has been successfully submitted!\n\n'
+                + `Your receipt: ${data.receipt}\n`
+                + `Keep it to check that your ballot was counted: /receipts/${data.receipt}/proof`);
 
             // Disable all inputs
             document